@@ -4,7 +4,8 @@
 #
 # to your $PYTHONSTARTUP file
 
-import re, exceptions, traceback, sys, os
+import re, exceptions, traceback, tokenize, keyword, code, sys, os
+import binascii, signal, subprocess, inspect, types, time, __builtin__
 
 # There's no version_info in 1.5.2.  Use sys.version instead
 if sys.version[0:3] < '2.1':
@@ -18,19 +19,52 @@ __date__ = "Sun Sep 30 15:38:50 PDT 2001"
 
 # This is deep, deep evil!  I love it!
 
-_auto_quote_funcs_=['cd', 'cp', 'cpr', 'delete', 'll', 'ln', 'lnh', 'lr', 
-                    'ls', 'mkdir', 'mv', 'popd', 'pushd', 'rm', 'rmdir', 'who',
-                    'whos', 'execfile']
-_auto_paren_funcs_=[]
+class _FuncTable(set):
+    """A set of function names that counts its changes, so that cached
+    translations can be flushed when it changes.  append() is add(), as
+    these tables used to be lists."""
+    def __init__(self, names=()):
+        set.__init__(self, names)
+        self.version = 0
+    def append(self, name):
+        self.add(name)
+
+def _counted(name):
+    method = getattr(set, name)
+    def counted(self, *args):
+        self.version = self.version + 1
+        return method(self, *args)
+    counted.__name__ = name
+    return counted
+for _name in ('add', 'remove', 'discard', 'pop', 'clear', 'update',
+              'difference_update', 'intersection_update',
+              'symmetric_difference_update', '__ior__', '__iand__',
+              '__isub__', '__ixor__'):
+    setattr(_FuncTable, _name, _counted(_name))
+del _counted, _name
+
+_auto_quote_funcs_=_FuncTable(['apropos', 'cd', 'cp', 'cpr', 'delete', 'du',
+                               'grep', 'll', 'ln', 'lnh', 'lr', 'ls', 'mkdir',
+                               'mv', 'popd', 'pushd', 'rm', 'rmdir', 'who',
+                               'whos', 'execfile'])
+_auto_paren_funcs_=_FuncTable(['await'])
 _PAREN_ESCAPE = '/'
 _QUOTE_ESCAPE = ','
 _SHELL_ESCAPE = '!'
+# The shell that runs shell escapes.  It is started once and kept running.
+_SHELL_COMMAND = ['/bin/sh']
 
 #####################################################################
 ###  You probably don't want to change things below here
 #####################################################################
 
 _first_word_re_=re.compile(r'^[ \t]*[^ \t\n]+[ \t\n]')
+# What may follow the first word of a shortcut that is also valid Python:
+# arguments, but not assignments, attribute access, calls or keywords.
+_lazy_args_re_=re.compile(r'[ \t]+(?!(=[^=]|[-+*/%&|^<>]+=|[.,:)\]}]|'
+                          r'(if|else|and|or|in|is|not|for|lambda)\b))\S')
+# Maximum number of translated command lines to remember
+_CACHE_SIZE = 500
 # All commands are evaluated in the interpreter's namespace
 _ns_ = sys.modules['__main__'].__dict__
 
@@ -72,10 +106,22 @@ that LazyPython does this:
         Any line that starts with '!' is treated as a shell escape. So
         if you want to copy a file you can type:
             >>> !cp file1.py file2.py
-        Note that !cd /some/dir won't change the working directory of
-        the Python interpreter.  All shell escapes take place in a subshell
-        that is immediately discarded.  You have to use os.chdir or the cd
-        convenience function to change the interpreter's directory.
+        All shell escapes run in the same long-lived subshell, so
+            >>> !cd /some/dir
+            >>> !export FOO=bar
+        affect later shell escapes, but not the Python interpreter.  You
+        have to use os.chdir or the cd convenience function to change the
+        interpreter's directory.  Output is shown as it arrives.  Starting
+        the line with '!!' captures the output instead and returns it as a
+        list of lines:
+            >>> !!ls *.py
+            ['LazyPython.py', 'startup.py']
+        In scripts, use LazyPython.shell('cmd', capture=1).  Shell escapes
+        don't read from the terminal, so use os.system for interactive
+        programs.  A shell escape ending in '&' is run as a background job
+        (see jobcontrol.py):
+            >>> !make -j4 &
+            [1] 12345 Running  make -j4
 
 IMPORTANT NOTES ON USAGE:  
     1.  The intent of this work is to make little functions like dir,
@@ -97,7 +143,9 @@ IMPORTANT NOTES ON USAGE:
             >>> len [1,2,3,4]        # Looks like indexing
             >>> zip (1,2,3), (4,5,6) # Looks like call + tuple construct
         In these cases you must force auto-quoting or auto-parenning with
-        the appropriate escape character.    
+        the appropriate escape character, or use LazyConsole, which
+        translates lines before they are compiled and also works in loops
+        and functions.
 
     4.  Whitespace is more important than usual (even for Python ;^)!  
         The function name must have some trailing whitespace and arguments 
@@ -118,27 +166,44 @@ IMPORTANT NOTES ON USAGE:
         function call out the old-fashioned way, ya lazy bum.
 
 Current Auto-Quote Functions:
-    cd, cp, cpr, delete, execfile, ll, ln, lnh, lr, ls, mkdir, mv, popd, 
-    pushd, rm, rmdir, who, whos
+    apropos, cd, cp, cpr, delete, du, execfile, grep, ll, ln, lnh, lr, ls,
+    mkdir, mv, popd, pushd, rm, rmdir, who, whos
 
 To extend this list for the current session, type:
-    >>> LazyPython._auto_quote_funcs_.append('funcname')
+    >>> LazyPython._auto_quote_funcs_.add('funcname')
 To permanently alter this list, edit LazyPython.py
 
+Current Auto-Paren Functions (these always get parentheses, even where the
+line could be valid Python):
+    await
+
+Translated command lines are cached, so repeating a command skips parsing
+and compiling it again.  The cache is flushed automatically when the
+auto-quote or auto-paren tables change; after other changes call
+    >>> sys.excepthook.clear_cache()
+
 Note that the characters used as escapes (!,/,,) can be changed by editing
 LazyPython.py
 """
     def __init__(self):
         # Save the original excepthook for use when there *is* an error
         self._orig_ehook = sys.excepthook
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Forget all cached command translations."""
+        # Maps a command line to (iFun, lp_mode, checked, newcmd, code).
+        # checked is true if the translation relied on iFun being callable.
+        self._cache = {}
+        self._cache_key = _tables_version()
+        # Maps a name to (the object it referred to, callable)
+        self._callable_cache = {}
         
     def uninstall(self):
         sys.excepthook = self._orig_ehook
         print "LazyPython uninstalled"
         
     def __call__(self, tp, val, argin3):
-        global _auto_quote_funcs_
-
         # We only handle SyntaxErrors
         if not isinstance(val, exceptions.SyntaxError):
             self._orig_ehook(tp,val,argin3)
@@ -151,49 +216,80 @@ LazyPython.py
         
         # Test for shell escape
         if val.text[0] == _SHELL_ESCAPE:
-            os.system(val.text[1:])
+            if val.text[1:2] == _SHELL_ESCAPE:
+                sys.displayhook(shell(val.text[2:], capture=1).splitlines())
+            elif _is_background(val.text):
+                sys.displayhook(background(val.text[1:]))
+            else:
+                shell(val.text[1:])
+            return
+
+        entry = self.translate(val.text)
+        if entry is None:
+            # Normal Exception
+            self._orig_ehook(tp,val,argin3)
             return
+        self._run(entry[3], entry[4])
+
+    def translate(self, text, pre=0):
+        """Translate a LazyPython command line into a Python command.
+
+        Returns a tuple (iFun, lp_mode, checked, newcmd, code), where code
+        is the compiled newcmd (or None if it doesn't compile), or None if
+        text is not a LazyPython command.  text must not start with
+        whitespace and must end with a newline.  If pre is true, text has not
+        been compiled yet and may well be valid Python; the shortcuts are then
+        applied to the ambiguous cases, too (see LazyConsole).
+        """
+        if self._cache_key != _tables_version():
+            self.clear_cache()
+        try:
+            entry = self._cache[text]
+        except KeyError:
+            pass
+        else:
+            if not entry[2] or self._is_callable(entry[0]):
+                return entry
+            del self._cache[text]
 
         # 0 -> normal exception, 1 -> auto-quote, 2 -> auto-paren
         lp_mode = 0
+        checked = 0
 
-
-        iFun = _first_word_re_.match(val.text)
+        iFun = _first_word_re_.match(text)
         if iFun is None:  #Hard to see how this could happen, but just in case
-            self._orig_ehook(tp,val,argin3)
-            return
+            return None
         iFun = iFun.group(0)[:-1]
 
-
-        if val.text[0] == _PAREN_ESCAPE:
+        if text[0] == _PAREN_ESCAPE:
             # Check for the auto-paren escape
             lp_mode = 2
             iFun = iFun[1:]
-            text = val.text[1:]
-        elif val.text[0] == _QUOTE_ESCAPE:
+            text = text[1:]
+        elif text[0] == _QUOTE_ESCAPE:
             # Check for the auto-quote escape
             lp_mode = 1
             iFun = iFun[1:]
-            text = val.text[1:]
+            text = text[1:]
+        elif pre and (keyword.iskeyword(iFun) or
+                      not _lazy_args_re_.match(text[len(iFun):])):
+            # Plain Python like "x = 1" or "import os"
+            return None
         else:
             # See if it's an auto-quote/paren function or a callable
-            text = val.text
             if iFun in _auto_quote_funcs_:
-                lp_mode = 1
+                if not pre or text[len(iFun):].lstrip()[0] not in '([':
+                    lp_mode = 1
             elif iFun in _auto_paren_funcs_:
                 lp_mode = 2
-            else:
-                try:
-                    if callable( eval(iFun, _ns_) ):
-                        lp_mode = 2
-                except:
-                    lp_mode = 0
+            elif self._is_callable(iFun) and \
+                    (not pre or self._wants_paren(iFun, text)):
+                lp_mode = 2
+                checked = 1
 
         # Now decide what to do based on lp_mode
         if lp_mode == 0:
-            # Normal Exception
-            self._orig_ehook(tp,val,argin3)
-            return
+            return None
 
         if lp_mode == 1:
             theRest = text[len(iFun):].strip()
@@ -204,18 +300,423 @@ LazyPython.py
             #newcmd = iFun + '(' + ','.join(theRest.split()) + ')\n'
             theRest = text[len(iFun):].strip()
             newcmd = iFun + '(' + theRest + ')\n'
-        elif lp_mode == 3:
-            pass # newcmd has already been set
         else:
             raise RuntimeError, 'Error in LazyPython.py!  Illegal lp_mode.'
 
+        try:
+            code = compile(newcmd, '<LazyPython>', 'eval')
+        except SyntaxError:
+            return (iFun, lp_mode, checked, newcmd, None)
+        entry = (iFun, lp_mode, checked, newcmd, code)
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[text] = entry
+        return entry
+
+    def _wants_paren(self, iFun, text):
+        # Decide whether a callable followed by arguments that may be valid
+        # Python (e.g. "len [1,2]" or "zip (1,2), (3,4)") is meant as a call.
+        theRest = text[len(iFun):].strip()
+        if theRest[0] == '[':
+            # Indexing a plain function can't work anyway
+            obj = _resolve(iFun)
+            if obj is _missing:
+                return False
+            if not isinstance(obj, (type, types.ClassType)):
+                obj = _class_of(obj)
+            return _getattr_static(obj, '__getitem__') is _missing
+        if theRest[0] == '(':
+            return _has_toplevel_comma(theRest)
+        if theRest[0].isalnum() or theRest[0] in '_\'"{`':
+            # Two expressions in a row are never valid Python
+            return True
+        # An operator.  Python wins if the line compiles.
+        try:
+            compile(text, '<LazyPython>', 'single')
+        except SyntaxError:
+            return True
+        return False
+
+    def _is_callable(self, iFun):
+        # Cached per plain name, and valid as long as the name refers to the
+        # same object.  Dotted names are resolved every time, as an
+        # attribute may be rebound without anything else changing.
+        if '.' in iFun:
+            return _is_callable(_resolve(iFun))
+        obj = _lookup(iFun)
+        try:
+            cached_obj, result = self._callable_cache[iFun]
+        except KeyError:
+            pass
+        else:
+            if cached_obj is obj:
+                return result
+        result = _is_callable(obj)
+        if len(self._callable_cache) >= _CACHE_SIZE:
+            self._callable_cache.clear()
+        self._callable_cache[iFun] = (obj, result)
+        return result
+
+    def _run(self, newcmd, code):
         # Try to execute the new command
         try:
             print '-->', newcmd
-            sys.displayhook( eval( newcmd, _ns_ ) )
+            if code is None:
+                # Let eval raise the SyntaxError
+                code = newcmd
+            sys.displayhook( eval( code, _ns_ ) )
             #exec newcmd in _ns_
         except:
             traceback.print_exc()
 
+def _tables_version():
+    # Changes whenever the auto-quote or auto-paren tables do, even if they
+    # were replaced by plain sets
+    return [(id(table), getattr(table, 'version', None), len(table))
+            for table in (_auto_quote_funcs_, _auto_paren_funcs_)]
+
+# Resolving names without running any code, so that checking whether the
+# first word of a line is callable can't trigger properties, __getattr__ or
+# lazy imports.
+
+_missing = []
+
+def _lookup(name):
+    try:
+        return _ns_[name]
+    except KeyError:
+        return __builtin__.__dict__.get(name, _missing)
+
+def _class_of(obj):
+    if isinstance(obj, types.InstanceType):
+        return obj.__class__
+    return type(obj)
+
+def _getattr_static(obj, name):
+    """Look up an attribute like getattr() does, but without calling
+    properties, __getattr__ or __getattribute__.  Returns _missing if the
+    attribute doesn't exist or can't be determined without running code."""
+    if isinstance(obj, (type, types.ClassType)):
+        classes = inspect.getmro(obj)
+    else:
+        try:
+            if isinstance(obj, types.InstanceType):
+                d = obj.__dict__
+            else:
+                d = object.__getattribute__(obj, '__dict__')
+        except (AttributeError, TypeError):
+            d = {}
+        if isinstance(d, dict) and name in d:
+            return d[name]
+        classes = inspect.getmro(_class_of(obj))
+    for klass in classes:
+        d = klass.__dict__
+        if name in d:
+            value = d[name]
+            if isinstance(value, (staticmethod, classmethod)):
+                return value.__get__(None, klass)
+            if isinstance(value, property):
+                return _missing
+            return value
+    return _missing
+
+def _resolve(name):
+    """Find the object a possibly dotted name refers to in the interpreter's
+    namespace, or _missing."""
+    parts = name.split('.')
+    obj = _lookup(parts[0])
+    for part in parts[1:]:
+        if obj is _missing:
+            break
+        obj = _getattr_static(obj, part)
+    return obj
+
+def _is_callable(obj):
+    if obj is _missing:
+        return False
+    if isinstance(obj, types.InstanceType):
+        # callable() would look up __call__, maybe through __getattr__
+        return _getattr_static(obj.__class__, '__call__') is not _missing
+    return callable(obj)
+
+def _inside_statement(lines):
+    # True if lines end inside brackets, a string or after a backslash, so
+    # that the next line continues their last statement
+    if not lines:
+        return False
+    source = '\n'.join(lines) + '\n'
+    try:
+        for tok in tokenize.generate_tokens(iter(source.splitlines(1)).next):
+            pass
+    except tokenize.TokenError:
+        return True
+    except SyntaxError:
+        pass
+    return False
+
+def _has_toplevel_comma(text):
+    depth = 0
+    try:
+        for tok in tokenize.generate_tokens(iter([text]).next):
+            if tok[0] != tokenize.OP:
+                continue
+            if tok[1] in '([{':
+                depth = depth + 1
+            elif tok[1] in ')]}':
+                depth = depth - 1
+            elif tok[1] == ',' and depth == 0:
+                return True
+    except (tokenize.TokenError, StopIteration):
+        pass
+    return False
+
+class Shell:
+    """A shell coprocess which runs commands sent over a pipe.
+
+    The shell is started on first use and survives between commands, so
+    changes to its environment stick.  It shares its working directory with
+    the interpreter: the shell is sent a cd when os.chdir() was called since
+    the last command, and the interpreter follows a cd done in the shell.
+    Each command is followed by a line printing a random marker, the exit
+    status and the working directory, which tells us where its output ends.
+    """
+    def __init__(self, command=None):
+        if command is None:
+            command = _SHELL_COMMAND
+        self.command = command
+        self.proc = None
+        # The shell's working directory
+        self.cwd = None
+
+    def start(self):
+        # Run it in its own process group, so that we can kill it together
+        # with whatever it is running.
+        self.cwd = os.getcwd()
+        self.proc = subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT,
+                                     close_fds=True, preexec_fn=os.setsid)
+
+    def forked(self):
+        """Call this in a forked process.  The shell is the parent's, so a
+        new one is started when it's needed."""
+        self.proc = None
+        self.cwd = None
+
+    def close(self):
+        """Kill the shell and everything it runs."""
+        if self.proc is None:
+            return
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.proc.wait()
+        self.proc = None
+
+    def run(self, cmd, capture=0):
+        """Run cmd in the shell.  Its output is written to sys.stdout as it
+        arrives and the exit status is returned, or, if capture is true, the
+        output is returned as a string.
+        """
+        marker = '__LazyPython_%s__ ' % binascii.hexlify(os.urandom(8))
+        # "command eval" keeps a syntax error in cmd from killing the shell
+        script = "{ command eval '%s'\n} </dev/null 2>&1\n" \
+                 "printf '\\n%s%%d %%s\\n' $? \"$PWD\"\n" % \
+                 (_sh_quote(cmd), marker)
+        for attempt in (0, 1):
+            if self.proc is None or self.proc.poll() is not None:
+                self.start()
+            cwd = os.getcwd()
+            if cwd != self.cwd:
+                script = "cd '%s'\n%s" % (_sh_quote(cwd), script)
+                self.cwd = cwd
+            try:
+                self.proc.stdin.write(script)
+                self.proc.stdin.flush()
+                break
+            except IOError:
+                # The shell died (e.g. "!exit"), start a new one
+                self.close()
+        else:
+            raise OSError, 'Unable to start %s' % ' '.join(self.command)
+
+        output = []
+        if capture:
+            emit = output.append
+        else:
+            def emit(data, write=sys.stdout.write, flush=sys.stdout.flush):
+                write(data)
+                flush()
+        fd = self.proc.stdout.fileno()
+        data = ''
+        marker = '\n' + marker
+        try:
+            while 1:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    # The command exited the shell
+                    emit(data)
+                    status = self.proc.wait()
+                    self.proc = None
+                    break
+                data = data + chunk
+                i = data.find(marker)
+                if i < 0:
+                    # Hold back what might be the start of the marker
+                    keep = len(marker)
+                    if len(data) > keep:
+                        emit(data[:-keep])
+                        data = data[-keep:]
+                elif data.endswith('\n'):
+                    emit(data[:i])
+                    status, cwd = data[i+len(marker):-1].split(' ', 1)
+                    status = int(status)
+                    self._follow(cwd)
+                    break
+        except KeyboardInterrupt:
+            self.close()
+            raise
+        if capture:
+            return ''.join(output)
+        return status
+
+    def _follow(self, cwd):
+        # Go where a cd in the shell went
+        self.cwd = cwd
+        if cwd != os.getcwd():
+            try:
+                os.chdir(cwd)
+            except OSError:
+                pass
+
+def _sh_quote(text):
+    # For use between single quotes
+    return text.replace("'", "'\\''")
+
+_shell = Shell()
+
+def shell(cmd, capture=0):
+    """Run a shell escape command in the persistent subshell."""
+    return _shell.run(cmd, capture)
+
+def shell_escape(cmd):
+    """Run a shell escape command inside a block.  Unlike shell(), this
+    returns None, so the exit status isn't echoed at the prompt."""
+    _shell.run(cmd)
+
+def _is_background(text):
+    text = text.rstrip()
+    return text.endswith('&') and not text.endswith('&&')
+
+def background(cmd):
+    """Run a shell escape command ending in '&' as a background job."""
+    import jobcontrol
+    return jobcontrol.bg(cmd.rstrip()[:-1].rstrip())
+
+
+class LazyConsole(code.InteractiveConsole):
+    """An interactive console that applies the LazyPython shortcuts *before*
+compiling each line, instead of waiting for a SyntaxError.  This saves the
+exception round trip and the second compile for every shortcut command, makes
+the shortcuts work inside loops and functions, and resolves the ambiguous
+cases where a shortcut is also valid Python:
+    >>> ls /usr/local/lib    # --> ls("/usr/local/lib")
+    >>> len [1,2,3,4]        # --> len([1,2,3,4])
+    >>> zip (1,2,3), (4,5,6) # --> zip((1,2,3), (4,5,6))
+Auto-paren is only applied to these if the result can't be valid Python
+anyway, e.g. "x [0]" still indexes x if x supports indexing.
+
+To use it, run this at the end of your $PYTHONSTARTUP file:
+    LazyPython.LazyConsole().interact()
+The interpreter exits when the console does.  Pass a timing.CommandTimer as
+timer to have every command timed.
+"""
+    def __init__(self, lazy=None, locals=None, filename="<console>",
+                 timer=None):
+        if locals is None:
+            locals = _ns_
+        code.InteractiveConsole.__init__(self, locals, filename)
+        if lazy is None:
+            lazy = LazyPython()
+        self.lazy = lazy
+        self.timer = timer
+
+    def interact(self, banner=''):
+        code.InteractiveConsole.interact(self, banner)
+        raise SystemExit
+
+    def push(self, line):
+        stripped = line.lstrip()
+        if not stripped or stripped[0] == '#' or \
+                _inside_statement(self.buffer):
+            # Lines continuing a statement, e.g. inside brackets or a
+            # triple-quoted string, are never shortcuts
+            return code.InteractiveConsole.push(self, line)
+        indent = line[:len(line) - len(stripped)]
+
+        if stripped[0] == _SHELL_ESCAPE:
+            if stripped[1:2] == _SHELL_ESCAPE:
+                newcmd = '__import__("LazyPython").shell(%r, capture=1)' \
+                         '.splitlines()' % stripped[2:]
+            elif _is_background(stripped):
+                newcmd = '__import__("LazyPython").background(%r)' % \
+                         stripped[1:]
+            elif not self.buffer:
+                self._call(line, shell, stripped[1:])
+                return False
+            else:
+                newcmd = '__import__("LazyPython").shell_escape(%r)' % \
+                         stripped[1:]
+            print '-->', newcmd
+            return code.InteractiveConsole.push(self, indent + newcmd)
+
+        try:
+            entry = self.lazy.translate(stripped + '\n', pre=1)
+        except:
+            entry = None
+        if entry is None:
+            return code.InteractiveConsole.push(self, line)
+        newcmd, compiled = entry[3], entry[4]
+        if not self.buffer and not indent and compiled is not None:
+            # Run the cached code object, no need to compile again
+            self._call(line, self.lazy._run, newcmd, compiled)
+            return False
+        print '-->', newcmd
+        return code.InteractiveConsole.push(self, indent + newcmd.rstrip())
+
+    def _call(self, line, func, *args):
+        if self.timer is None:
+            return func(*args)
+        return self.timer.run(line, func, *args)
+
+    def runsource(self, source, filename="<input>", symbol="single"):
+        if self.timer is None:
+            return code.InteractiveConsole.runsource(self, source, filename,
+                                                     symbol)
+        start = time.time()
+        more = code.InteractiveConsole.runsource(self, source, filename,
+                                                 symbol)
+        if not more:
+            self.timer.record(source, time.time() - start)
+        return more
+
+    def _excepthook(self):
+        hook = sys.excepthook
+        if isinstance(hook, LazyPython):
+            hook = hook._orig_ehook
+        return hook
+
+    def showtraceback(self):
+        tp, val, tb = sys.exc_info()
+        sys.last_type, sys.last_value, sys.last_traceback = tp, val, tb
+        # Skip our own frame
+        self._excepthook()(tp, val, tb and tb.tb_next)
+
+    def showsyntaxerror(self, filename=None):
+        tp, val, tb = sys.exc_info()
+        sys.last_type, sys.last_value, sys.last_traceback = tp, val, tb
+        self._excepthook()(tp, val, None)
+
 
 print 'Welcome to Lazy Python.  Type "help LazyPython" for help.'
@@ -0,0 +1,437 @@
+"""
+completer.py -- Tab completion for the interactive prompt.
+
+An rlcompleter replacement that keeps things fast:
+
+* Attribute listings are cached per object and searched with bisect, so
+  objects with thousands of attributes complete instantly.  The cache entry
+  is dropped when the object's __dict__ changes size.
+* After one of LazyPython's auto-quote functions (ls, cd, cp, rm, ...), a
+  ',' or '!' escape, or inside a string literal, filenames are completed.
+  Directory listings are cached until the directory's mtime changes.
+* Module names are completed after 'import' and 'from', using an index of
+  the modules on sys.path (see ModuleIndex).
+
+Installation:
+    import readline, completer
+    modules = completer.ModuleIndex('/path/to/module_index')
+    modules.update_in_background()
+    readline.set_completer(completer.Completer(modules=modules).complete)
+    readline.parse_and_bind('tab: complete')
+"""
+
+import os, re, sys, imp, bisect, weakref, threading, cPickle, __main__
+import rlcompleter
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# Don't look up more than this many matches to see whether they're callable
+_MAX_POSTFIX = 100
+# Number of objects and directories whose listings are cached
+_CACHE_SIZE = 200
+
+_attr_re = re.compile(r'(\w+(\.\w+)*)\.(\w*)$')
+_import_re = re.compile(r'^\s*(import\s+(.*,\s*)?|from\s+)([\w.]*)$')
+_from_import_re = re.compile(r'^\s*from\s+([\w.]+)\s+import\s+(.*,\s*)?'
+                             r'(\w*)$')
+_first_word_re = re.compile(r'^\s*([\w.]+)\s')
+
+_suffixes = [suffix for suffix, mode, kind in imp.get_suffixes()]
+
+
+def _prefixed(names, prefix):
+    """Return the items of the sorted list names starting with prefix."""
+    i = bisect.bisect_left(names, prefix)
+    j = i
+    while j < len(names) and names[j].startswith(prefix):
+        j = j + 1
+    return names[i:j]
+
+
+class DirectoryCache:
+    """Sorted directory listings, kept until the directory changes."""
+    def __init__(self):
+        self._cache = {}
+
+    def listdir(self, path):
+        """Return the sorted entries of path, with a '/' appended to
+        directories."""
+        path = path or os.curdir
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return []
+        try:
+            cached_mtime, names = self._cache[path]
+            if cached_mtime == mtime:
+                return names
+        except KeyError:
+            pass
+        names = []
+        try:
+            if scandir is not None:
+                for entry in scandir(path):
+                    if entry.is_dir():
+                        names.append(entry.name + '/')
+                    else:
+                        names.append(entry.name)
+            else:
+                for name in os.listdir(path):
+                    if os.path.isdir(os.path.join(path, name)):
+                        name = name + '/'
+                    names.append(name)
+        except OSError:
+            return []
+        names.sort()
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[path] = (mtime, names)
+        return names
+
+
+class ModuleIndex:
+    """The names of the modules importable from sys.path.
+
+    The top-level modules of every sys.path entry are remembered together
+    with the entry's mtime, and only entries whose mtime changed are scanned
+    again.  If filename is given the index is kept there between sessions.
+    Use update_in_background() to build it without delaying the prompt;
+    until it's done, lookups use what has been indexed so far.
+    """
+    def __init__(self, filename=None, dircache=None):
+        self.filename = filename
+        self.dircache = dircache or DirectoryCache()
+        # Maps a sys.path entry to (mtime, {module name: filename})
+        self.entries = {}
+        self._loaded = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._key = None
+        self._names = []
+        self._files = {}
+
+    def _modules_in(self, path):
+        modules = {}
+        for name in self.dircache.listdir(path):
+            if name.endswith('/'):
+                name = name[:-1]
+                init = os.path.join(path, name, '__init__.py')
+                if '.' not in name and os.path.exists(init):
+                    modules.setdefault(name, init)
+                continue
+            for suffix in _suffixes:
+                if name.endswith(suffix):
+                    modules.setdefault(name[:-len(suffix)],
+                                       os.path.join(path, name))
+                    break
+        return modules
+
+    def load(self):
+        """Read the index saved by an earlier session."""
+        self._loaded = 1
+        if not self.filename:
+            return
+        try:
+            fp = open(self.filename, 'rb')
+            try:
+                entries = cPickle.load(fp)
+            finally:
+                fp.close()
+        except Exception:
+            return
+        if isinstance(entries, dict):
+            self._lock.acquire()
+            try:
+                for path, entry in entries.items():
+                    self.entries.setdefault(path, entry)
+            finally:
+                self._lock.release()
+
+    def save(self):
+        if not self.filename:
+            return
+        tmpname = '%s.%d' % (self.filename, os.getpid())
+        try:
+            fp = open(tmpname, 'wb')
+            try:
+                cPickle.dump(self.entries, fp, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                fp.close()
+            os.rename(tmpname, self.filename)
+        except (IOError, OSError):
+            pass
+
+    def update(self):
+        """Rescan the sys.path entries that changed since they were indexed,
+        and save the index if anything changed."""
+        if not self._loaded:
+            self.load()
+        changed = 0
+        for path in sys.path:
+            path = path or os.curdir
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                continue
+            if not os.path.isdir(path):
+                continue
+            modules = self._modules_in(path)
+            self._lock.acquire()
+            try:
+                self.entries[path] = (mtime, modules)
+            finally:
+                self._lock.release()
+            changed = 1
+        if changed:
+            self.save()
+
+    def update_in_background(self):
+        """Build or refresh the index in a background thread."""
+        self._thread = threading.Thread(target=self.update)
+        self._thread.setDaemon(1)
+        self._thread.start()
+
+    def forked(self):
+        """Call this in a process forked while the background thread may
+        have been running.  The thread is gone there, and so is the lock it
+        may have held."""
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _index(self):
+        # Bring the index up to date, unless the background thread is still
+        # at it, and return (sorted names, {name: filename}).
+        if self._thread is None or not self._thread.isAlive():
+            self.update()
+        self._lock.acquire()
+        try:
+            key = (tuple(sys.path), [(path, entry[0]) for path, entry in
+                                     self.entries.items()])
+            if key != self._key:
+                files = {}
+                for path in reversed(sys.path):
+                    entry = self.entries.get(path or os.curdir)
+                    if entry is not None:
+                        files.update(entry[1])
+                for name in sys.builtin_module_names:
+                    files[name] = None
+                names = files.keys()
+                names.sort()
+                self._key, self._names, self._files = key, names, files
+            return self._names, self._files
+        finally:
+            self._lock.release()
+
+    def modules(self):
+        """Return the sorted names of all top-level modules."""
+        return self._index()[0]
+
+    def find(self, name):
+        """Return the file of the module with the given (dotted) name,
+        None for built-in modules, or raise ImportError."""
+        top = name.split('.')[0]
+        files = self._index()[1]
+        if not files.has_key(top):
+            raise ImportError, 'No module named ' + top
+        if '.' not in name:
+            return files[top]
+        if not files[top] or \
+                os.path.basename(files[top]) != '__init__.py':
+            raise ImportError, '%s is not a package' % top
+        path = [os.path.dirname(files[top])]
+        for part in name.split('.')[1:]:
+            fp, pathname, stuff = imp.find_module(part, path)
+            if fp:
+                fp.close()
+            if stuff[2] == imp.PKG_DIRECTORY:
+                path = [pathname]
+                pathname = os.path.join(pathname, '__init__.py')
+        return pathname
+
+    def submodules(self, package):
+        """Return the sorted names of the modules in a package."""
+        path = None
+        try:
+            for part in package.split('.'):
+                fp, pathname, stuff = imp.find_module(part, path)
+                if fp:
+                    fp.close()
+                if stuff[2] != imp.PKG_DIRECTORY:
+                    return []
+                path = [pathname]
+        except ImportError:
+            return []
+        names = self._modules_in(path[0]).keys()
+        if '__init__' in names:
+            names.remove('__init__')
+        names.sort()
+        return names
+
+
+class Completer(rlcompleter.Completer):
+    def __init__(self, namespace=None, modules=None):
+        rlcompleter.Completer.__init__(self, namespace)
+        self.dircache = DirectoryCache()
+        if modules is None:
+            modules = ModuleIndex(dircache=self.dircache)
+        self.modules = modules
+        # Maps id(object), or the type of objects that can't be weakly
+        # referenced, to (reference, key, sorted attribute names)
+        self._attrs = {}
+
+    def complete(self, text, state):
+        if state == 0:
+            try:
+                import readline
+                line = readline.get_line_buffer()[:readline.get_endidx()]
+            except (ImportError, AttributeError):
+                line = text
+            try:
+                self.matches = self.line_matches(line, text)
+            except Exception:
+                self.matches = []
+        try:
+            return self.matches[state]
+        except IndexError:
+            return None
+
+    def line_matches(self, line, text):
+        """Compute the completions of text, the end of line."""
+        if self.use_main_ns:
+            self.namespace = __main__.__dict__
+        m = _from_import_re.match(line)
+        if m:
+            names = dict.fromkeys(self.modules.submodules(m.group(1)))
+            module = sys.modules.get(m.group(1))
+            if module is not None:
+                names.update(dict.fromkeys(self._attr_names(module)))
+            names = names.keys()
+            names.sort()
+            return _prefixed(names, text)
+        m = _import_re.match(line)
+        if m:
+            return self.module_matches(m.group(3), text)
+        word = self._path_word(line)
+        if word is not None:
+            return self.path_matches(word, text)
+        if '.' in text:
+            return self.attr_matches(text)
+        return self.global_matches(text)
+
+    def _path_word(self, line):
+        # Return the filename being typed if line calls for filenames.
+        quote = None
+        for c in line:
+            if c == quote:
+                quote = None
+            elif quote is None and c in '\'"':
+                quote = c
+        if quote is not None:
+            return line[line.rfind(quote)+1:]
+        stripped = line.lstrip()
+        if not stripped:
+            return None
+        if stripped[0] not in ',!':
+            m = _first_word_re.match(stripped)
+            lazy = sys.modules.get('LazyPython')
+            if m is None or lazy is None or \
+                    m.group(1) not in lazy._auto_quote_funcs_:
+                return None
+        return re.split(r'\s', line)[-1]
+
+    def path_matches(self, word, text):
+        """Complete the filename word, of which text is the end."""
+        dirname, basename = os.path.split(word)
+        path = os.path.expanduser(os.path.expandvars(dirname))
+        names = self.dircache.listdir(path)
+        if not basename.startswith('.'):
+            names = [name for name in _prefixed(names, basename)
+                     if not name.startswith('.')]
+        else:
+            names = _prefixed(names, basename)
+        skip = len(word) - len(text)
+        return [os.path.join(dirname, name)[skip:] for name in names]
+
+    def module_matches(self, name, text):
+        if '.' in name:
+            package, prefix = name.rsplit('.', 1)
+            names = _prefixed(self.modules.submodules(package), prefix)
+            names = ['%s.%s' % (package, n) for n in names]
+        else:
+            names = _prefixed(self.modules.modules(), name)
+        skip = len(name) - len(text)
+        return [n[skip:] for n in names]
+
+    def _attr_names(self, obj):
+        # Cached sorted dir() of obj, plus its class' members.  Objects that
+        # can't be weakly referenced (lists, dicts, ...) are cached by their
+        # type, which is all their attributes depend on, so that the cache
+        # doesn't keep them alive.
+        d = getattr(obj, '__dict__', None)
+        if isinstance(d, dict):
+            key = (type(obj), len(d))
+        else:
+            key = (type(obj), None)
+        try:
+            ref = weakref.ref(obj)
+            target, cache_id = obj, id(obj)
+        except TypeError:
+            target = cache_id = type(obj)
+            if d is not None:
+                # It has attributes of its own: don't cache
+                target = None
+            else:
+                ref = weakref.ref(target)
+        if target is not None:
+            try:
+                ref, cached_key, names = self._attrs[cache_id]
+                if ref() is target and cached_key == key:
+                    return names
+            except KeyError:
+                pass
+        words = dict.fromkeys(dir(obj))
+        words.pop('__builtins__', None)
+        if hasattr(obj, '__class__'):
+            words['__class__'] = 1
+            words.update(dict.fromkeys(
+                rlcompleter.get_class_members(obj.__class__)))
+        names = words.keys()
+        names.sort()
+        if target is not None:
+            if len(self._attrs) >= _CACHE_SIZE:
+                self._attrs.clear()
+            self._attrs[cache_id] = (ref, key, names)
+        return names
+
+    def attr_matches(self, text):
+        """Compute matches when text contains a dot, like rlcompleter does,
+        but from a cached listing."""
+        m = _attr_re.match(text)
+        if not m:
+            return []
+        expr, attr = m.group(1, 3)
+        try:
+            obj = eval(expr, self.namespace)
+        except Exception:
+            return []
+        names = _prefixed(self._attr_names(obj), attr)
+        if len(names) > _MAX_POSTFIX:
+            return ['%s.%s' % (expr, name) for name in names]
+        matches = []
+        for name in names:
+            try:
+                value = getattr(obj, name)
+            except Exception:
+                continue
+            matches.append(self._callable_postfix(value,
+                                                  '%s.%s' % (expr, name)))
+        return matches
@@ -7,6 +7,14 @@ You can then disable it with:
     
 Alternatively, you can add a dreload builtin alongside normal reload with:
     >>> __builtin__.dreload = deep_reload.reload
+
+To find out which modules make a reload slow, use:
+    >>> deep_reload.report(mymodule).summary()
+
+Modules from the standard library and site-packages are never reloaded unless
+you set deep_reload.exclude_system = 0 (or pass system=1).  Additional
+exclusions can be names, prefixes or glob patterns:
+    >>> dreload(mymodule, exclude=['numpy', 'myapp.vendor.*'])
     
 This code is almost entirely based on knee.py from the standard library.
 """
@@ -15,7 +23,12 @@ __author__ = "Nathaniel Gray <n8gray@caltech.edu>"
 __version__ = 0.5
 __date__ = "21 August 2001"
 
-import sys, imp, __builtin__
+import sys, os, imp, time, types, struct, fnmatch, py_compile, __builtin__
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
 
 # Replacement for __import__()
 def deep_import_hook(name, globals=None, locals=None, fromlist=None):
@@ -102,12 +115,130 @@ def ensure_fromlist(m, fromlist, recursive=0):
             if not submod:
                 raise ImportError, "No module named " + subname
 
+class ReloadReport:
+    """Timing information gathered during a deep reload.
+
+    entries is a list of (fqname, total, own, chain) tuples in the order the
+    modules were reloaded.  total is the wall-clock time spent loading the
+    module including the modules it pulled in, own is that time minus the
+    time spent in nested reloads (i.e. the cost of the module's own top-level
+    code), and chain is the tuple of module names that led to the reload,
+    outermost first.
+    """
+    def __init__(self, module=None):
+        self.module = module
+        self.entries = []
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, fqname, total, own, chain):
+        self.entries.append((fqname, total, own, chain))
+
+    def sorted(self, key='own'):
+        """Return the entries sorted by 'own' or 'total' time, slowest first."""
+        index = {'total': 1, 'own': 2}[key]
+        entries = self.entries[:]
+        entries.sort(lambda a, b: cmp(b[index], a[index]))
+        return entries
+
+    def summary(self, limit=20, key='own', file=None):
+        """Print the slowest reloads, sorted by 'own' or 'total' time."""
+        if file is None:
+            file = sys.stdout
+        print >>file, 'Reloaded %d modules in %.3fs' % (len(self.entries),
+                                                       self.total)
+        for fqname, total, own, chain in self.sorted(key)[:limit]:
+            line = '  %8.3fs %8.3fs  %s' % (own, total, fqname)
+            if chain:
+                line += '  (via %s)' % ' -> '.join(chain)
+            print >>file, line
+
+# Modules which are never reloaded.  Entries match the module itself and,
+# as a prefix, all of its submodules, and may contain glob patterns.
+default_exclude = ['sys', '__builtin__', '__main__']
+
+# Don't reload modules living in the standard library or in site-packages
+exclude_system = 1
+
 # Need to keep track of what we've already reloaded to prevent cyclic evil
 found_now = {}
 
+# The exclusion patterns and system policy of the reload in progress, and the
+# name of the module being reloaded, which is reloaded even if excluded.
+_exclude = []
+_exclude_system = 0
+_target = None
+
+_system_dirs = None
+
+def system_dirs():
+    """Return the directories holding the standard library and site-packages.
+    """
+    global _system_dirs
+    if _system_dirs is None:
+        dirs = []
+        try:
+            from distutils import sysconfig
+            for plat in (0, 1):
+                dirs.append(sysconfig.get_python_lib(plat, standard_lib=1))
+                dirs.append(sysconfig.get_python_lib(plat))
+        except ImportError:
+            pass
+        try:
+            import site
+            dirs.extend(site.getsitepackages())
+        except (ImportError, AttributeError):
+            pass
+        for path in sys.path:
+            if os.path.basename(path) in ('site-packages', 'dist-packages'):
+                dirs.append(path)
+        _system_dirs = []
+        for d in dirs:
+            d = os.path.join(os.path.realpath(d), '')
+            if d not in _system_dirs:
+                _system_dirs.append(d)
+    return _system_dirs
+
+def is_excluded(fqname, exclude=(), system=1):
+    """Check whether a module should be left alone by the deep reload.
+
+    exclude is a sequence of module names, which also match their submodules,
+    or glob patterns like 'django.*'.  If system is true, built-in modules and
+    modules located in the standard library or site-packages are excluded,
+    too.
+    """
+    for pattern in exclude:
+        if fqname == pattern or fqname.startswith(pattern + '.') or \
+                fnmatch.fnmatchcase(fqname, pattern):
+            return True
+    if not system:
+        return False
+    m = sys.modules.get(fqname)
+    if m is None:
+        return False
+    fname = getattr(m, '__file__', None)
+    if not fname:
+        # Built-in module
+        return True
+    fname = os.path.realpath(fname)
+    for d in system_dirs():
+        if fname.startswith(d):
+            return True
+    return False
+
+# The modules currently being reloaded, outermost first, and the report for
+# the reload in progress.  last_report holds the report of the last reload.
+_chain = []
+_child_time = []
+_report = None
+last_report = None
+
 def import_module(partname, fqname, parent):
     global found_now
-    if found_now.has_key(fqname):
+    if found_now.has_key(fqname) or (fqname != _target and
+            is_excluded(fqname, _exclude, _exclude_system)):
         try:
             return sys.modules[fqname]    
         except KeyError:
@@ -117,16 +248,27 @@ def import_module(partname, fqname, parent):
             #sys.displayhook is sys.__displayhook__
     
     found_now[fqname] = 1
+    start = time.time()
     try:
         fp, pathname, stuff = imp.find_module(partname,
                                               parent and parent.__path__)
     except ImportError:
         return None
         
+    chain = tuple(_chain)
+    _chain.append(fqname)
+    _child_time.append(0.0)
     try:
         m = imp.load_module(fqname, fp, pathname, stuff)
     finally:
         if fp: fp.close()
+        _chain.pop()
+        children = _child_time.pop()
+        elapsed = time.time() - start
+        if _child_time:
+            _child_time[-1] += elapsed
+        if _report is not None:
+            _report.add(fqname, elapsed, elapsed - children, chain)
         
     if parent:
         setattr(parent, partname, m)
@@ -142,28 +284,167 @@ def deep_reload_hook(module):
     parent = sys.modules[pname]
     return import_module(name[i+1:], name, parent)
 
+def _is_stale(source):
+    """True if the bytecode cache for the given source file is out of date
+    and can be written."""
+    cfile = source + (__debug__ and 'c' or 'o')
+    if os.path.exists(cfile):
+        writable = os.access(cfile, os.W_OK)
+    else:
+        writable = os.access(os.path.dirname(cfile) or os.curdir, os.W_OK)
+    if not writable:
+        # Compiling it again and again would be of no use
+        return False
+    try:
+        mtime = long(os.stat(source).st_mtime)
+        fp = open(cfile, 'rb')
+    except (OSError, IOError):
+        return True
+    try:
+        header = fp.read(8)
+    finally:
+        fp.close()
+    if len(header) < 8 or header[:4] != imp.get_magic():
+        return True
+    return struct.unpack('<I', header[4:])[0] != (mtime & 0xFFFFFFFFL)
+
+def _compile(source):
+    # Runs in the worker processes.  Errors are left for the serial phase,
+    # which reports them with the proper traceback.
+    try:
+        py_compile.compile(source, doraise=True)
+    except Exception:
+        return source
+    return None
+
+def used_modules(module, exclude=(), system=1):
+    """Return the names of the modules a deep reload of module may reload:
+    module, its submodules and the modules it uses, directly or through
+    the modules it uses, that aren't excluded.  exclude and system are as
+    for is_excluded()."""
+    found = {}
+    todo = [module.__name__]
+    prefix = module.__name__ + '.'
+    for name, m in sys.modules.items():
+        if m is not None and name.startswith(prefix):
+            todo.append(name)
+    while todo:
+        name = todo.pop()
+        m = sys.modules.get(name)
+        if m is None or found.has_key(name) or \
+                (name != module.__name__ and
+                 is_excluded(name, exclude, system)):
+            continue
+        found[name] = 1
+        for value in m.__dict__.values():
+            if isinstance(value, types.ModuleType):
+                todo.append(value.__name__)
+            else:
+                used = getattr(value, '__module__', None)
+                if isinstance(used, str):
+                    todo.append(used)
+    return found.keys()
+
+def changed_modules(exclude=(), system=1, names=None):
+    """Return the source files of the modules named in names (by default
+    all of sys.modules) whose bytecode cache is out of date and can be
+    written.  exclude and system are as for is_excluded()."""
+    if names is None:
+        names = sys.modules.keys()
+    sources = []
+    for name in names:
+        m = sys.modules.get(name)
+        if m is None or is_excluded(name, exclude, system):
+            continue
+        fname = getattr(m, '__file__', None)
+        if not fname:
+            continue
+        base, ext = os.path.splitext(fname)
+        if ext not in ('.py', '.pyc', '.pyo'):
+            continue
+        source = base + '.py'
+        if source not in sources and os.path.exists(source) and \
+                _is_stale(source):
+            sources.append(source)
+    return sources
+
+def precompile(sources, processes=None):
+    """Compile the given source files and write their bytecode caches, using
+    a process pool when there is more than one file.  Returns the list of
+    files that failed to compile.
+    """
+    if len(sources) > 1 and multiprocessing is not None:
+        pool = multiprocessing.Pool(processes)
+        try:
+            failed = pool.map(_compile, sources)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        failed = map(_compile, sources)
+    return [source for source in failed if source]
+
 # Save the original hooks
 original_reload = __builtin__.reload
 
 # Replacement for reload()
-def reload(module, exclude=['sys', '__builtin__', '__main__']):
+def reload(module, exclude=None, summary=0, parallel=1, system=None):
     """Recursively reload all modules used in the given module.  Optionally
     takes a list of modules to exclude from reloading.  The default exclude
     list contains sys, __main__, and __builtin__, to prevent, e.g., resetting 
-    display, exception, and io hooks.
+    display, exception, and io hooks.  The entries of exclude also match
+    submodules and may be glob patterns, e.g. ['numpy', 'django.*'].
+
+    Unless system is true (it defaults to deep_reload.exclude_system being
+    false), modules from the standard library and site-packages are never
+    reloaded.
+
+    Timing for every reloaded module is kept in deep_reload.last_report.  If
+    summary is true the slowest modules are printed after the reload.
+
+    If parallel is true, the modules to be reloaded whose source changed
+    since they were last compiled are compiled in a process pool before the
+    (serial) reload, unless writing bytecode is turned off
+    (sys.dont_write_bytecode or PYTHONDONTWRITEBYTECODE).
     """
-    global found_now
-    for i in exclude:
-        found_now[i] = 1
+    global found_now, _report, last_report, _exclude, _exclude_system, _target
+    if exclude is None:
+        exclude = default_exclude
+    if system is None:
+        system = not exclude_system
+    _exclude = list(exclude)
+    _exclude_system = not system
+    _target = module.__name__
+    if parallel and not sys.dont_write_bytecode:
+        precompile(changed_modules(_exclude, _exclude_system,
+                                   used_modules(module, _exclude,
+                                                _exclude_system)))
+    report = ReloadReport(module)
+    _report = report
     original_import = __builtin__.__import__
     __builtin__.__import__ = deep_import_hook    
+    start = time.time()
     try:
         ret = deep_reload_hook(module)
     finally:
+        report.total = time.time() - start
         __builtin__.__import__ = original_import
         found_now = {}
+        _exclude, _exclude_system, _target = [], 0, None
+        del _chain[:], _child_time[:]
+        _report = None
+        last_report = report
+    if summary:
+        report.summary()
     return ret
 
+def report(module, exclude=None, parallel=1, system=None):
+    """Deep reload the given module and return its ReloadReport.
+    Usage:  >>> deep_reload.report(mymodule).summary()
+    """
+    reload(module, exclude, parallel=parallel, system=system)
+    return last_report
+
 # Uncomment the following to automatically activate deep reloading whenever
 # this module is imported
 #__builtin__.reload = dreload
@@ -0,0 +1,191 @@
+"""
+diskusage.py -- A fast du for the prompt.
+
+    >>> du('~/src')
+shows the total disk usage of a directory and its largest entries.  The
+directory tree is read by several threads at once, and files with more
+than one hard link are counted once.
+
+What is read from a directory is kept together with the directory's mtime,
+so running du again only reads the directories that changed: those where
+entries were added, removed or renamed.  (A file that grew in place
+doesn't change its directory's mtime; use du(path, rescan=1) to read
+everything again.)
+"""
+
+import os, sys, stat, time, threading, Queue
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# The number of threads reading directories
+threads = 8
+
+# The most directories remembered between calls
+max_cached = 200000
+
+# Maps a directory to (mtime, usage of its files, [(device, inode, usage)]
+# for its files with several links, [names of subdirectories])
+_cache = {}
+
+def _usage(st):
+    # Disk usage, like du shows it
+    try:
+        return st.st_blocks * 512
+    except AttributeError:
+        return st.st_size
+
+def _read(path):
+    st = os.lstat(path)
+    entry = _cache.get(path)
+    if entry is not None and entry[0] == st.st_mtime:
+        return entry
+    size = _usage(st)
+    links = []
+    subdirs = []
+    if scandir is not None:
+        entries = [(e.name, e) for e in scandir(path)]
+    else:
+        entries = [(name, None) for name in os.listdir(path)]
+    for name, e in entries:
+        try:
+            if e is not None:
+                if e.is_dir(follow_symlinks=False):
+                    subdirs.append(name)
+                    continue
+                est = e.stat(follow_symlinks=False)
+            else:
+                est = os.lstat(os.path.join(path, name))
+                if stat.S_ISDIR(est.st_mode):
+                    subdirs.append(name)
+                    continue
+        except OSError:
+            continue
+        if est.st_nlink > 1:
+            links.append((est.st_dev, est.st_ino, _usage(est)))
+        else:
+            size = size + _usage(est)
+    entry = (st.st_mtime, size, links, subdirs)
+    _cache[path] = entry
+    return entry
+
+def _read_tree(top):
+    # Read all directories under top with several threads, returning
+    # {path: entry}
+    entries = {}
+    queue = Queue.Queue()
+    stopped = []
+    # The exception that stopped the walk, raised again by the caller
+    errors = []
+    def work():
+        while 1:
+            path = queue.get()
+            if path is None:
+                # Done
+                return
+            try:
+                if not stopped:
+                    try:
+                        entry = _read(path)
+                    except OSError:
+                        pass
+                    except:
+                        errors.append(sys.exc_info())
+                        stopped.append(1)
+                    else:
+                        entries[path] = entry
+                        for name in entry[3]:
+                            queue.put(os.path.join(path, name))
+            finally:
+                queue.task_done()
+    queue.put(top)
+    workers = []
+    for i in range(threads):
+        thread = threading.Thread(target=work)
+        thread.setDaemon(1)
+        thread.start()
+        workers.append(thread)
+    try:
+        # Queue.join() can't be interrupted, so wait in small steps
+        while queue.unfinished_tasks:
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        # The workers skip what's left in the queue, then stop
+        stopped.append(1)
+        for thread in workers:
+            queue.put(None)
+        raise
+    for thread in workers:
+        queue.put(None)
+    for thread in workers:
+        thread.join()
+    if errors:
+        etype, value, tb = errors[0]
+        raise etype, value, tb
+    if len(_cache) > max_cached:
+        # Keep what this walk read
+        _cache.clear()
+        if len(entries) <= max_cached:
+            _cache.update(entries)
+    return entries
+
+def usage(path, rescan=0):
+    """Return the disk usage of path, and a list of (usage, name) for its
+    entries, largest first."""
+    path = os.path.abspath(os.path.expanduser(path))
+    if rescan:
+        for cached in _cache.keys():
+            if cached == path or cached.startswith(path + os.sep):
+                del _cache[cached]
+    if not os.path.isdir(path) or os.path.islink(path):
+        return _usage(os.lstat(path)), []
+    entries = _read_tree(path)
+    seen = {}
+    def total(path):
+        entry = entries.get(path)
+        if entry is None:
+            return 0
+        size = entry[1]
+        for dev, ino, link_size in entry[2]:
+            if not seen.has_key((dev, ino)):
+                seen[(dev, ino)] = 1
+                size = size + link_size
+        for name in entry[3]:
+            size = size + total(os.path.join(path, name))
+        return size
+    top = entries.get(path)
+    if top is None:
+        raise OSError, "Can't read %s" % path
+    children = []
+    for name in top[3]:
+        children.append((total(os.path.join(path, name)), name + '/'))
+    # The files of path itself
+    own = top[1]
+    for dev, ino, link_size in top[2]:
+        if not seen.has_key((dev, ino)):
+            seen[(dev, ino)] = 1
+            own = own + link_size
+    size = own + sum([child_size for child_size, name in children])
+    children.append((own, '(files)'))
+    children.sort()
+    children.reverse()
+    return size, children
+
+def du(path=os.curdir, top=10, rescan=0):
+    """Show the disk usage of a directory and of its largest entries.
+    Usage:  >>> du(['dirname' [, top]])   (brackets mean [optional] argument)
+    """
+    from workspace import format_size
+    start = time.time()
+    size, children = usage(path, rescan)
+    top = int(top)
+    for child_size, name in children[:top]:
+        print '%10s  %s' % (format_size(child_size), name)
+    if len(children) > top:
+        print '%10s  (%d more)' % ('...', len(children) - top)
+    print '%10s  total (%.2f s)' % (format_size(size), time.time() - start)
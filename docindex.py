@@ -0,0 +1,424 @@
+"""
+docindex.py -- Search the documentation of every module without importing it.
+
+The docstrings of the modules on sys.path, and of their classes, functions
+and methods, are read from the source files (which are parsed, not
+imported) into an index.  Like completer.ModuleIndex, it is built in a
+background thread, kept in a file between sessions, and only files that
+changed are read again.
+
+    >>> apropos('socket', 'timeout')     # Ranked search of names and docs
+    >>> help('json.dumps')               # Shown from the index, no import
+
+help() of an object shows what pydoc.help would, but the rendered page of
+a module, class or function is kept in a cache directory until the
+module's source changes, so big modules come up instantly the next time.
+
+Installation:
+    import docindex
+    docindex.index = docindex.DocIndex('/path/to/doc_index', '/path/to/pages')
+    docindex.index.update_in_background()
+    from docindex import apropos, help
+"""
+
+import os, sys, ast, glob, types, threading, cPickle, pydoc
+
+# Longest docstring kept in the index
+max_doc = 2000
+# Don't parse source files bigger than this
+max_source = 1024 * 1024
+
+# The index used by apropos() and help(), set up by startup.py
+index = None
+
+def _signature(node):
+    # The argument list of an ast.FunctionDef
+    args = node.args
+    names = []
+    for arg in args.args:
+        if isinstance(arg, ast.Name):
+            names.append(arg.id)
+        else:
+            names.append('(...)')
+    first = len(names) - len(args.defaults)
+    for i in range(first, len(names)):
+        names[i] = names[i] + '=...'
+    if args.vararg:
+        names.append('*' + args.vararg)
+    if args.kwarg:
+        names.append('**' + args.kwarg)
+    return '(' + ', '.join(names) + ')'
+
+def _docs(tree, modname):
+    # [(name, kind, lineno, signature, doc)] for a module and its contents
+    docs = [(modname, 'module', 1, '', ast.get_docstring(tree) or '')]
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            docs.append(('%s.%s' % (modname, node.name), 'function',
+                         node.lineno, _signature(node),
+                         ast.get_docstring(node) or ''))
+        elif isinstance(node, ast.ClassDef):
+            classname = '%s.%s' % (modname, node.name)
+            docs.append((classname, 'class', node.lineno, '',
+                         ast.get_docstring(node) or ''))
+            for child in node.body:
+                if isinstance(child, ast.FunctionDef):
+                    docs.append(('%s.%s' % (classname, child.name), 'method',
+                                 child.lineno, _signature(child),
+                                 ast.get_docstring(child) or ''))
+    return [(name, kind, lineno, sig, doc[:max_doc])
+            for name, kind, lineno, sig, doc in docs]
+
+def _sources(directory, package=''):
+    # Yield (filename, module name) for the modules in directory
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    names.sort()
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith('.py'):
+            modname = name[:-3]
+            if modname == '__init__':
+                if not package:
+                    continue
+                modname = package
+            elif package:
+                modname = package + '.' + modname
+            if '.' not in name[:-3] and '-' not in name:
+                yield path, modname
+        elif '.' not in name and '-' not in name and \
+                os.path.isfile(os.path.join(path, '__init__.py')):
+            for source in _sources(path, package and package + '.' + name
+                                   or name):
+                yield source
+
+def _directory(path, modname):
+    # The sys.path entry (with a trailing separator) path was found in as
+    # module modname
+    name = os.path.join(*modname.split('.'))
+    for tail in (name + '.py', os.path.join(name, '__init__.py')):
+        if path.endswith(os.sep + tail):
+            return path[:-len(tail)]
+    return None
+
+
+class DocIndex:
+    """The docstrings of the modules on sys.path, by source file."""
+    def __init__(self, filename=None, pages_dir=None):
+        self.filename = filename
+        self.pages_dir = pages_dir
+        # Maps a source file to (mtime, [(name, kind, lineno, signature,
+        # docstring)])
+        self.entries = {}
+        self._loaded = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = 0
+        self._registered = 0
+        self._key = None
+        # [(lowercase name, lowercase last part, lowercase doc, whether it's
+        # private or a test, entry)]
+        self._search = []
+        # Maps a name to (filename, entry)
+        self._names = {}
+
+    def load(self):
+        """Read the index saved by an earlier session."""
+        self._loaded = 1
+        if not self.filename:
+            return
+        try:
+            fp = open(self.filename, 'rb')
+            try:
+                entries = cPickle.load(fp)
+            finally:
+                fp.close()
+        except Exception:
+            return
+        if isinstance(entries, dict):
+            self._lock.acquire()
+            try:
+                for path, entry in entries.items():
+                    self.entries.setdefault(path, entry)
+            finally:
+                self._lock.release()
+
+    def save(self):
+        if not self.filename:
+            return
+        tmpname = '%s.%d' % (self.filename, os.getpid())
+        try:
+            fp = open(tmpname, 'wb')
+            try:
+                cPickle.dump(self.entries, fp, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                fp.close()
+            os.rename(tmpname, self.filename)
+        except (IOError, OSError):
+            pass
+
+    def update(self):
+        """Read the source files that changed since they were indexed, and
+        save the index if anything changed."""
+        if not self._loaded:
+            self.load()
+        changed = 0
+        seen = {}
+        for directory in sys.path:
+            for path, modname in _sources(directory or os.curdir):
+                if self._stopped:
+                    # Keep what was read so far, for the next session
+                    if changed:
+                        self.save()
+                    return
+                if seen.has_key(path):
+                    continue
+                seen[path] = 1
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entry = self.entries.get(path)
+                if entry is not None and entry[0] == st.st_mtime:
+                    continue
+                docs = []
+                if st.st_size <= max_source:
+                    try:
+                        fp = open(path)
+                        try:
+                            source = fp.read()
+                        finally:
+                            fp.close()
+                        docs = _docs(ast.parse(source, path), modname)
+                    except Exception:
+                        pass
+                self._lock.acquire()
+                try:
+                    self.entries[path] = (st.st_mtime, docs)
+                finally:
+                    self._lock.release()
+                changed = 1
+        # Files outside this sys.path may belong to another virtualenv
+        # sharing the index, so only those that are gone are dropped
+        gone = [path for path in self.entries.keys()
+                if not seen.has_key(path) and not os.path.exists(path)]
+        if gone:
+            self._lock.acquire()
+            try:
+                for path in gone:
+                    self.entries.pop(path, None)
+            finally:
+                self._lock.release()
+            changed = 1
+        if changed:
+            self.save()
+
+    def update_in_background(self):
+        """Build or refresh the index in a background thread, which stops
+        when the interpreter exits."""
+        self._stopped = 0
+        self._thread = threading.Thread(target=self.update)
+        self._thread.setDaemon(1)
+        self._thread.start()
+        if not self._registered:
+            self._registered = 1
+            import atexit
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the background thread, saving what it has read."""
+        self._stopped = 1
+        if self._thread is not None:
+            self._thread.join()
+
+    def forked(self):
+        """Call this in a process forked while the background thread may
+        have been running.  The thread doesn't survive the fork, so the
+        index is brought up to date again in this process."""
+        self._lock = threading.Lock()
+        if self._thread is not None:
+            self._thread = None
+            self.update_in_background()
+
+    def _tables(self):
+        # The search list and name table of the files on sys.path, rebuilt
+        # when the index or sys.path changed
+        self._lock.acquire()
+        try:
+            key = ([(path, entry[0]) for path, entry in self.entries.items()],
+                   sys.path[:])
+            if key != self._key:
+                search = []
+                names = {}
+                # The directories as update() joins them to the files it reads
+                prefixes = {}
+                for directory in sys.path:
+                    prefixes[os.path.join(directory or os.curdir, '')] = 1
+                for path, (mtime, docs) in self.entries.items():
+                    if not docs or not prefixes.has_key(
+                            _directory(path, docs[0][0])):
+                        continue
+                    for doc in docs:
+                        name = doc[0].lower()
+                        parts = name.split('.')
+                        # Private names and tests come after the rest
+                        minor = 0
+                        for part in parts:
+                            if part.startswith('test') or \
+                                    part.startswith('_') and \
+                                    not part.endswith('__'):
+                                minor = 1
+                        search.append((name, parts[-1], doc[4].lower(),
+                                       minor, doc))
+                        names.setdefault(doc[0], (path, doc))
+                self._key, self._search, self._names = key, search, names
+            return self._search, self._names
+        finally:
+            self._lock.release()
+
+    def search(self, words, limit=20):
+        """Return the entries mentioning all words, best matches first:
+        those named after a word, then those with a word in their name,
+        then by how often the words occur in their docs.  Private names and
+        tests come last."""
+        words = [word.lower() for word in words if word]
+        if not words:
+            return []
+        found = []
+        for name, last, doc, minor, entry in self._tables()[0]:
+            score = 0
+            for word in words:
+                if word == last:
+                    score = score + 100
+                elif word in last:
+                    score = score + 50
+                elif word in name:
+                    score = score + 20
+                else:
+                    count = doc.count(word)
+                    if not count:
+                        break
+                    score = score + min(count, 5)
+            else:
+                found.append((minor, -score, len(name), entry))
+        found.sort()
+        return [entry for minor, score, length, entry in found[:limit]]
+
+    def lookup(self, name):
+        """Return (filename, entry) for a dotted name, or None."""
+        return self._tables()[1].get(name)
+
+    def page(self, name):
+        """Return the help text for a dotted name from the index, or
+        None."""
+        found = self.lookup(name)
+        if found is None:
+            return None
+        path, (name, kind, lineno, signature, doc) = found
+        lines = ['%s %s%s' % (kind, name, signature), '']
+        if doc:
+            lines.extend(['    ' + line for line in doc.splitlines()])
+            lines.append('')
+        if kind in ('module', 'class'):
+            prefix = name + '.'
+            members = [entry[0][len(prefix):] for entry in
+                       self.entries.get(path, (0, []))[1]
+                       if entry[0].startswith(prefix) and
+                       '.' not in entry[0][len(prefix):]]
+            if members:
+                lines.append('Contents: ' + ', '.join(members))
+                lines.append('')
+        lines.append('Defined in %s, line %d' % (path, lineno))
+        return '\n'.join(lines) + '\n'
+
+    def _page_file(self, obj):
+        # The file a rendered help page of obj is cached in, or None
+        if not self.pages_dir:
+            return None
+        if isinstance(obj, types.ModuleType):
+            module, name = obj, obj.__name__
+        elif isinstance(obj, (type, types.ClassType, types.FunctionType)):
+            module = sys.modules.get(getattr(obj, '__module__', None))
+            name = '%s.%s' % (getattr(module, '__name__', ''),
+                              getattr(obj, '__name__', ''))
+        else:
+            return None
+        source = getattr(module, '__file__', None)
+        if not source or name.startswith('__main__'):
+            return None
+        try:
+            mtime = int(os.stat(source).st_mtime)
+        except OSError:
+            return None
+        return os.path.join(self.pages_dir, '%s-%d.txt' % (name, mtime))
+
+    def render(self, obj):
+        """Return pydoc's help text for obj, from the cache if possible."""
+        cached = self._page_file(obj)
+        if cached is not None:
+            try:
+                fp = open(cached)
+                try:
+                    return fp.read()
+                finally:
+                    fp.close()
+            except IOError:
+                pass
+        text = pydoc.render_doc(obj)
+        if cached is not None:
+            try:
+                if not os.path.isdir(self.pages_dir):
+                    os.makedirs(self.pages_dir)
+                # Pages of earlier versions of the source are useless now
+                for old in glob.glob(cached[:cached.rindex('-')] + '-*.txt'):
+                    os.remove(old)
+                fp = open(cached, 'w')
+                try:
+                    fp.write(text)
+                finally:
+                    fp.close()
+            except (IOError, OSError):
+                pass
+        return text
+
+
+def apropos(*words):
+    """Search the names and docstrings of everything on sys.path.
+    Usage:  >>> apropos('word' [, 'word' ...])
+    """
+    if index is None:
+        pydoc.apropos(' '.join(words))
+        return
+    for name, kind, lineno, signature, doc in index.search(words):
+        if len(signature) > 30:
+            signature = '(...)'
+        line = name + signature
+        summary = doc and doc.strip().splitlines()[0]
+        if summary:
+            line = line + ' - ' + summary
+        if len(line) > 79:
+            line = line[:76] + '...'
+        print line
+
+def help(*objects):
+    """Show the documentation of objects, or of dotted names.
+    Usage:  >>> help(object [, obj2, objN])  (brackets mean [optional] argument)
+    Names are looked up in the docstring index, without importing anything;
+    pydoc's help is used for everything else.
+    """
+    if not objects or index is None:
+        return pydoc.help(*objects)
+    for obj in objects:
+        if isinstance(obj, str):
+            text = index.page(obj)
+            if text is None:
+                pydoc.help(obj)
+            else:
+                pydoc.pager(text)
+        elif isinstance(obj, (types.ModuleType, type, types.ClassType,
+                              types.FunctionType)):
+            pydoc.pager(index.render(obj))
+        else:
+            pydoc.help(obj)
@@ -0,0 +1,130 @@
+"""
+eventloop.py -- A persistent event loop for the interactive prompt.
+
+Testing asynchronous code at the prompt usually means running a new event
+loop for every command, which closes the connections and pools the code
+opened.  Instead, this runs one event loop for the whole session in a
+background thread, and await() runs coroutines on it:
+    >>> session = await(connect('db.example.com'))
+    >>> await(session.query('select 1'))
+
+With LazyPython, the parentheses can be left out at the start of a line:
+    >>> await session.query('select 1')
+
+Ctrl-C cancels the coroutine being waited for.  Use start() to leave a
+coroutine running in the background.  This needs an asyncio-compatible
+event loop: trollius on Python 2.
+"""
+
+import sys, threading
+
+try:
+    import trollius as asyncio
+except ImportError:
+    try:
+        import asyncio
+    except ImportError:
+        asyncio = None
+
+_loop = None
+_lock = threading.Lock()
+
+def _run_forever(loop):
+    # Code that looks up "the current loop" should find this one
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+def forked():
+    """Call this in a forked process.  The loop's thread is gone there, so
+    a new loop is started when one is needed."""
+    global _loop, _lock
+    _loop = None
+    _lock = threading.Lock()
+
+def get_loop():
+    """Return the session's event loop, starting it if necessary."""
+    global _loop
+    if asyncio is None:
+        raise ImportError, 'eventloop needs trollius (or asyncio)'
+    _lock.acquire()
+    try:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_run_forever, args=(loop,))
+            thread.setDaemon(1)
+            thread.start()
+            _loop = loop
+        return _loop
+    finally:
+        _lock.release()
+
+def _submit(aw):
+    # Schedule aw on the loop and return (task, event set when it's done)
+    loop = get_loop()
+    done = threading.Event()
+    holder = []
+    def schedule():
+        try:
+            task = asyncio.ensure_future(aw, loop=loop)
+        except Exception:
+            holder.append(sys.exc_info())
+            done.set()
+            return
+        holder.append(task)
+        task.add_done_callback(lambda task: done.set())
+    loop.call_soon_threadsafe(schedule)
+    return holder, done
+
+def start(aw):
+    """Run a coroutine on the session's loop in the background.
+    Usage:  >>> task = start(coroutine)
+    Returns a handle with done(), result() and cancel(), like a task has.
+    """
+    return _Handle(*_submit(aw))
+
+def await(aw, timeout=None):
+    """Run a coroutine (or wait for a future) on the session's event loop
+    and return its result.
+    Usage:  >>> await(coroutine[, timeout])
+    """
+    return _Handle(*_submit(aw)).result(timeout)
+
+
+class _Handle:
+    """A task on the loop, used from another thread."""
+    def __init__(self, holder, done):
+        self._holder = holder
+        self._done = done
+
+    def done(self):
+        return self._done.isSet()
+
+    def cancel(self):
+        if self._holder and not isinstance(self._holder[0], tuple):
+            get_loop().call_soon_threadsafe(self._holder[0].cancel)
+
+    def result(self, timeout=None):
+        """Wait for the task to finish and return its result.  Ctrl-C or
+        running out of time cancels it."""
+        import time
+        if timeout is not None:
+            end = time.time() + timeout
+        try:
+            # Wait in small steps, so that Ctrl-C works
+            while not self._done.isSet():
+                if timeout is not None and time.time() >= end:
+                    self.cancel()
+                    raise asyncio.TimeoutError
+                self._done.wait(0.1)
+        except KeyboardInterrupt:
+            self.cancel()
+            raise
+        task = self._holder[0]
+        if isinstance(task, tuple):
+            raise task[0], task[1], task[2]
+        return task.result()
+
+    def __repr__(self):
+        if not self._holder or isinstance(self._holder[0], tuple):
+            return '<Task starting>'
+        return repr(self._holder[0])
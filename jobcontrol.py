@@ -0,0 +1,224 @@
+"""
+jobcontrol.py -- Background shell jobs for the interactive prompt.
+
+Long-running shell commands can be started without blocking the prompt:
+    >>> bg('make -j4')
+    [1] 12345 Running  make -j4
+    >>> jobs()
+    [1] 12345 Running  make -j4
+    >>> fg()        # Show the output so far and wait for the job to finish
+    >>> wait()      # Wait for all jobs to finish
+
+With LazyPython, a shell escape ending in '&' runs in the background, too:
+    >>> !make -j4 &
+
+Every job runs in its own process group with its output captured into a
+buffer (see Job.output), so a Ctrl-C at the prompt doesn't kill it.  A
+thread per job collects the output and reaps the process when it exits.
+Jobs run in the interpreter's current directory.
+"""
+
+import os, sys, time, signal, threading, subprocess
+
+# Keep at most this many bytes of output per job, dropping the oldest
+max_output = 1024 * 1024
+
+class Job:
+    """A shell command running in the background."""
+    def __init__(self, id, cmd, capture=1):
+        self.id = id
+        self.cmd = cmd
+        self.capture = capture
+        self.status = None
+        self.announced = 0
+        self._chunks = []
+        self._dropped = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if capture:
+            stdout = subprocess.PIPE
+        else:
+            stdout = None
+        devnull = open(os.devnull)
+        try:
+            self.proc = subprocess.Popen(cmd, shell=True, stdout=stdout,
+                                         stderr=subprocess.STDOUT,
+                                         stdin=devnull, close_fds=True,
+                                         preexec_fn=os.setsid)
+        finally:
+            devnull.close()
+        self.pid = self.proc.pid
+        thread = threading.Thread(target=self._collect)
+        thread.setDaemon(1)
+        thread.start()
+
+    def _collect(self):
+        if self.capture:
+            fd = self.proc.stdout.fileno()
+            while 1:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    break
+                self._lock.acquire()
+                try:
+                    self._chunks.append(chunk)
+                    self._size = self._size + len(chunk)
+                    while self._size > max_output and len(self._chunks) > 1:
+                        self._size = self._size - len(self._chunks.pop(0))
+                        self._dropped = self._dropped + 1
+                finally:
+                    self._lock.release()
+            self.proc.stdout.close()
+        self.status = self.proc.wait()
+        self._done.set()
+
+    def running(self):
+        return not self._done.isSet()
+
+    def state(self):
+        if self.running():
+            return 'Running'
+        if self.status == 0:
+            return 'Done'
+        if self.status < 0:
+            return 'Killed (signal %d)' % -self.status
+        return 'Exit %d' % self.status
+
+    def output(self):
+        """Return the captured output."""
+        return self.read(0)[0]
+
+    def read(self, start):
+        """Return the output starting at chunk number start, and the number
+        of the next chunk."""
+        self._lock.acquire()
+        try:
+            data = ''.join(self._chunks[max(start - self._dropped, 0):])
+            return data, self._dropped + len(self._chunks)
+        finally:
+            self._lock.release()
+
+    def wait(self, timeout=None):
+        """Wait for the job to finish and return its exit status, or None
+        if it is still running after timeout seconds."""
+        # Wait in small steps, so that Ctrl-C works
+        if timeout is not None:
+            end = time.time() + timeout
+        while self.running():
+            if timeout is not None and time.time() >= end:
+                break
+            self._done.wait(0.1)
+        return self.status
+
+    def kill(self, sig=signal.SIGTERM):
+        """Send a signal to the job and everything it started."""
+        try:
+            os.killpg(self.pid, sig)
+        except OSError:
+            pass
+
+    def __repr__(self):
+        return '[%d] %d %s  %s' % (self.id, self.pid, self.state(), self.cmd)
+
+class JobTable:
+    """The background jobs started in this session."""
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 1
+
+    def start(self, cmd, capture=1):
+        self.announce()
+        job = Job(self.next_id, cmd, capture)
+        if capture:
+            self.jobs[job.id] = job
+            self.next_id = self.next_id + 1
+        else:
+            # Not worth listing, just reap it when it's done
+            job.announced = 1
+        return job
+
+    def get(self, job=None):
+        """Look up a job by number, defaulting to the most recent one."""
+        if isinstance(job, Job):
+            return job
+        if job is None:
+            if not self.jobs:
+                raise ValueError, 'No jobs'
+            return self.jobs[max(self.jobs.keys())]
+        try:
+            return self.jobs[job]
+        except KeyError:
+            raise ValueError, 'No such job: %r' % (job,)
+
+    def announce(self):
+        """Print the jobs that finished since the last call."""
+        for id in sorted(self.jobs.keys()):
+            job = self.jobs[id]
+            if not job.running() and not job.announced:
+                print job
+                job.announced = 1
+
+_table = JobTable()
+
+def spawn(cmd):
+    """Run a shell command in the background with its output going to the
+    terminal.  The process is reaped when it exits."""
+    return _table.start(cmd, capture=0)
+
+def bg(cmd):
+    """Run a shell command in the background.
+    Usage:  >>> bg('make -j4')
+    Returns the Job, whose output is collected in job.output().
+    """
+    return _table.start(cmd)
+
+def jobs():
+    """List the background jobs and forget the ones that have finished.
+    Usage:  >>> jobs()
+    """
+    for id in sorted(_table.jobs.keys()):
+        job = _table.jobs[id]
+        print job
+        if not job.running():
+            del _table.jobs[id]
+
+def wait(job=None, timeout=None):
+    """Wait for a background job to finish, or for all of them.
+    Usage:  >>> wait([job_number])   (brackets mean [optional] argument)
+    Returns the exit status of the job.
+    """
+    if job is None:
+        for id in sorted(_table.jobs.keys()):
+            _table.jobs[id].wait(timeout)
+        _table.announce()
+        return None
+    job = _table.get(job)
+    status = job.wait(timeout)
+    _table.announce()
+    return status
+
+def fg(job=None):
+    """Show the output of a background job and wait for it to finish.
+    Usage:  >>> fg([job_number])   (brackets mean [optional] argument)
+    Ctrl-C stops waiting but leaves the job running.
+    """
+    job = _table.get(job)
+    print job.cmd
+    shown = 0
+    try:
+        while 1:
+            running = job.running()
+            data, shown = job.read(shown)
+            if data:
+                sys.stdout.write(data)
+                sys.stdout.flush()
+            if not running:
+                break
+            job._done.wait(0.1)
+    except KeyboardInterrupt:
+        print
+        print job
+        return None
+    _table.announce()
+    return job.status
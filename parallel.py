@@ -0,0 +1,218 @@
+"""
+parallel.py -- Use all processors from the prompt.
+
+pmap is map() run by a pool of worker processes, imap its lazy version:
+    >>> pmap(crunch, filenames)
+    >>> for result in imap(crunch, filenames, ordered=0, progress=1):
+    ...     print result
+
+The pool is started when it's first needed and kept for the session.  The
+workers are forked, so they see everything defined at the prompt, lambdas
+included; when a function is used that the workers don't have yet (or that
+uses globals that were reassigned since), the pool is forked again.
+
+Items are sent to the workers in chunks whose size is tuned as results come
+in, aiming at chunk_time seconds of work per chunk.  Ctrl-C stops the
+workers.  An exception in a worker is raised as a WorkerError carrying the
+worker's traceback, as ultraTB.ColorTB shows it.
+"""
+
+import sys, time, types, signal, traceback
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+# The number of worker processes, None for one per processor
+processes = None
+# The amount of work per chunk that the chunk size is tuned for, in seconds
+chunk_time = 0.1
+
+class WorkerError(Exception):
+    """An exception raised by a function in a worker process."""
+
+_pool = None
+# The functions the workers know about, passed to them by index.  Forked
+# workers get a copy, so it's only changed when the pool is (re)started.
+_functions = []
+# Maps the index of a function to the ids of the __main__ globals it used
+# when the pool was forked
+_globals = {}
+
+def _init_worker():
+    # Ctrl-C is for the parent, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        # Linux: die with the parent, even if it's killed
+        import ctypes
+        ctypes.CDLL(None).prctl(1, signal.SIGTERM)
+    except Exception:
+        pass
+
+def _run_chunk(index, items):
+    # Runs in a worker.  Returns (1, results, seconds) or (0, traceback).
+    func = _functions[index]
+    start = time.time()
+    results = []
+    try:
+        for item in items:
+            results.append(func(item))
+    except Exception:
+        etype, value, tb = sys.exc_info()
+        return 0, _format_error(etype, value, tb.tb_next)
+    return 1, results, time.time() - start
+
+def _format_error(etype, value, tb):
+    try:
+        import ultraTB
+        return ultraTB.ColorTB().text(etype, value, tb)
+    except ImportError:
+        return ''.join(traceback.format_exception(etype, value, tb))
+
+def _names(code):
+    # The global names used by a code object and the functions in it
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_names(const))
+    return names
+
+def _globals_of(func):
+    import __main__
+    code = getattr(func, 'func_code', None)
+    if code is None or getattr(func, '__module__', None) != '__main__':
+        return {}
+    ids = {}
+    for name in _names(code):
+        ids[name] = id(__main__.__dict__.get(name))
+    return ids
+
+def stop():
+    """Stop the worker processes."""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+
+def forked():
+    """Call this in a forked process.  The workers belong to the parent,
+    so a pool of our own is started when one is needed."""
+    global _pool
+    _pool = None
+
+def _get_pool(func):
+    # Return the pool and the index of func in the workers' _functions
+    global _pool, _functions
+    if multiprocessing is None:
+        raise ImportError, 'parallel needs the multiprocessing module'
+    for index in range(len(_functions)):
+        if _functions[index] is func:
+            break
+    else:
+        index = None
+    if _pool is not None and index is not None and \
+            _globals[index] == _globals_of(func):
+        return _pool, index
+    # Fork the workers again, so that they know about func
+    stop()
+    functions = [f for i, f in enumerate(_functions)
+                 if f is not func and _globals[i] == _globals_of(f)]
+    functions.append(func)
+    _functions = functions
+    _globals.clear()
+    for i in range(len(functions)):
+        _globals[i] = _globals_of(functions[i])
+    _pool = multiprocessing.Pool(processes, _init_worker)
+    return _pool, len(functions) - 1
+
+def imap(func, iterable, chunksize=None, ordered=1, progress=0):
+    """Return an iterator applying func to the items of iterable in worker
+    processes.
+    Usage:  >>> imap(func, iterable[, chunksize, ordered, progress])
+    With ordered=0 the results come in the order they are ready; with
+    progress=1 the number of items done is shown while waiting.
+    """
+    pool, index = _get_pool(func)
+    try:
+        total = len(iterable)
+    except TypeError:
+        total = None
+    items = iter(iterable)
+    workers = processes or multiprocessing.cpu_count()
+    size = chunksize or 1
+    # The AsyncResults of the chunks being worked on
+    pending = []
+    done = 0
+    exhausted = 0
+    try:
+        while 1:
+            # Keep every worker busy, but don't read ahead too far
+            while not exhausted and len(pending) < 2 * workers:
+                chunk = []
+                for item in items:
+                    chunk.append(item)
+                    if len(chunk) >= size:
+                        break
+                if len(chunk) < size:
+                    exhausted = 1
+                if chunk:
+                    pending.append(pool.apply_async(_run_chunk,
+                                                    (index, chunk)))
+            if not pending:
+                break
+            if ordered:
+                ready = pending[0]
+            else:
+                ready = None
+                while ready is None:
+                    for result in pending:
+                        if result.ready():
+                            ready = result
+                            break
+                    else:
+                        pending[0].wait(0.01)
+            # Wait in small steps, so that Ctrl-C works
+            while not ready.ready():
+                ready.wait(0.1)
+            pending.remove(ready)
+            outcome = ready.get()
+            if not outcome[0]:
+                raise WorkerError, '%s failed in a worker:\n%s' % \
+                      (getattr(func, '__name__', func), outcome[1])
+            results, seconds = outcome[1], outcome[2]
+            if chunksize is None and results:
+                # Aim at chunk_time seconds per chunk, growing gradually,
+                # but leave enough chunks to spread over the workers
+                if seconds > 0:
+                    best = int(chunk_time * len(results) / seconds)
+                else:
+                    best = 2 * size
+                size = max(1, min(best, 2 * size))
+                if total is not None:
+                    size = max(1, min(size, total // (4 * workers)))
+            done = done + len(results)
+            if progress:
+                if total is None:
+                    sys.stderr.write('\r%d done' % done)
+                else:
+                    sys.stderr.write('\r%d/%d done' % (done, total))
+            for result in results:
+                yield result
+    except KeyboardInterrupt:
+        stop()
+        raise
+    if progress:
+        sys.stderr.write('\n')
+
+def pmap(func, iterable, chunksize=None, ordered=1, progress=0):
+    """Like map(func, iterable), using all processors.
+    Usage:  >>> pmap(func, iterable[, chunksize, ordered, progress])
+    See imap for the options.
+    """
+    return list(imap(func, iterable, chunksize, ordered, progress))
+
+import atexit
+atexit.register(stop)
+del atexit
@@ -0,0 +1,133 @@
+"""
+search.py -- grep without leaving Python.
+
+igrep(pattern, paths) searches files for a regular expression and yields a
+Match(filename, lineno, line) for every matching line, as they're found.
+Directories are searched recursively, skipping version control and other
+directories named in ignored_dirs, and binary files are skipped.  Files are
+memory-mapped instead of read, and when there are many of them they are
+searched by the worker processes of parallel.imap.
+
+startup.py turns this into grep(), whose result can be passed to edit():
+    >>> grep('def main', '*.py')
+       0 setup.py:12: def main():
+    >>> edit(_[0])
+"""
+
+import os, re, stat, mmap, itertools, collections
+
+# Directories that are never searched
+ignored_dirs = set(['.git', '.hg', '.svn', '.bzr', 'CVS', '__pycache__',
+                    'node_modules', '.tox', '.venv'])
+# Search in worker processes when there are at least this many files
+parallel_files = 50
+# Files with a NUL byte in their first block are skipped as binary
+_BLOCK = 1024
+
+class Match(collections.namedtuple('Match', 'filename lineno line')):
+    """A line found by igrep."""
+    __slots__ = ()
+    def __repr__(self):
+        return '%s:%d: %s' % self
+
+class Matches(list):
+    """A list of Matches, shown one per line with their index."""
+    def __repr__(self):
+        return '\n'.join(['%4d %r' % (i, self[i]) for i in range(len(self))])
+
+def _is_file(path):
+    # Not a FIFO, socket or device, which open() may wait on forever
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return 0
+
+def files(paths):
+    """Yield the regular files under paths, skipping ignored directories."""
+    for path in paths:
+        if not os.path.isdir(path):
+            if _is_file(path):
+                yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if d not in ignored_dirs]
+            dirnames.sort()
+            filenames.sort()
+            for name in filenames:
+                filename = os.path.join(dirpath, name)
+                if _is_file(filename):
+                    yield filename
+
+def search_file(args):
+    """Return [(lineno, line)] for the lines of a file matching a pattern.
+    args is (filename, pattern, flags), so that this can be run by
+    parallel.imap."""
+    filename, pattern, flags = args
+    regex = re.compile(pattern, flags | re.MULTILINE)
+    try:
+        fp = open(filename, 'rb')
+    except IOError:
+        return []
+    try:
+        try:
+            size = os.fstat(fp.fileno()).st_size
+            if not size:
+                return []
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError):
+            return []
+        try:
+            if '\0' in data[:_BLOCK]:
+                return []
+            found = []
+            lineno = 1
+            counted = 0
+            pos = 0
+            while pos <= size:
+                m = regex.search(data, pos)
+                if m is None:
+                    break
+                start = data.rfind('\n', 0, m.start()) + 1
+                end = data.find('\n', m.end())
+                if end < 0:
+                    end = size
+                lineno = lineno + data[counted:start].count('\n')
+                counted = start
+                found.append((lineno, data[start:end].rstrip('\r')))
+                # One match per line is enough
+                pos = end + 1
+            return found
+        finally:
+            data.close()
+    finally:
+        fp.close()
+
+def _search_job(job):
+    # search_file, also returning the file name, for imap
+    return job[0], search_file(job)
+
+def igrep(pattern, paths, flags=0):
+    """Search the files under paths for pattern and yield a Match for every
+    matching line."""
+    if not isinstance(pattern, basestring):
+        pattern, flags = pattern.pattern, pattern.flags
+    else:
+        re.compile(pattern, flags)  # Complain about a bad pattern right away
+    jobs = ((name, pattern, flags) for name in files(paths))
+    # Only look ahead far enough to know whether there are many files, so
+    # that matches come in while the directories are still being read
+    first = list(itertools.islice(jobs, parallel_files))
+    jobs = itertools.chain(first, jobs)
+    results = None
+    if len(first) >= parallel_files:
+        try:
+            import parallel
+            if parallel.multiprocessing is not None:
+                results = parallel.imap(_search_job, jobs)
+        except ImportError:
+            pass
+    if results is None:
+        results = itertools.imap(_search_job, jobs)
+    for name, found in results:
+        for lineno, line in found:
+            yield Match(name, lineno, line)
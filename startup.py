@@ -104,6 +104,63 @@ del editorbase
 # The place to store your command history between sessions
 histfile = os.path.join(user_dir, "history")
 
+# Use VerboseTB's detailed tracebacks instead of ColorTB's, and save them
+# as crash dumps in crash_dir.  Set PYTHONVERBOSETB=1 in your environment to
+# enable it.  Use ultraTB.show_dump() to look at a dump again.
+verbose_tracebacks = bool(os.environ.get('PYTHONVERBOSETB'))
+crash_dir = os.path.join(user_dir, "crashes")
+
+# Let go of the frames of the last exception right away instead of keeping
+# them for pdb.pm(), keeping only a snapshot of their locals for pm().  Set
+# PYTHONRELEASEFRAMES=1 in your environment if big locals linger too long.
+release_frames = bool(os.environ.get('PYTHONRELEASEFRAMES'))
+
+# An error repeating within this many seconds of the last time it occurred,
+# e.g. in a callback, is only counted instead of printing its traceback
+# again.  Set PYTHONREPEATWINDOW=2 in your environment to enable it.
+repeat_window = float(os.environ.get('PYTHONREPEATWINDOW') or 0)
+
+# The number of results kept in the output history (_1, _2, ... and out[n]),
+# and the memory they may use
+output_cache_size = 100
+output_cache_bytes = 256 * 1024 * 1024
+
+# The place where save_session() keeps the variables of your sessions, and
+# whether to save them whenever the interpreter exits
+session_dir = os.path.join(user_dir, "sessions")
+save_session_at_exit = 0
+
+# The place to keep the index of importable modules used for completion
+module_index_file = os.path.join(user_dir, "module_index")
+module_index = None
+
+# The place to keep the index of docstrings used by apropos() and help(),
+# and the help pages rendered for modules, classes and functions
+doc_index_file = os.path.join(user_dir, "doc_index")
+help_cache_dir = os.path.join(user_dir, "help")
+doc_index = None
+
+# Run the interactive session in LazyPython's console, which applies the
+# LazyPython shortcuts before compiling each line instead of after a
+# SyntaxError.  Set PYTHONLAZYCONSOLE=1 in your environment to enable it.
+lazy_console = bool(os.environ.get('PYTHONLAZYCONSOLE'))
+
+# Time every command, print the time of those taking more than
+# slow_command_time seconds and add them to slow_command_log.  This needs a
+# console of our own like the one above; set PYTHONTIMECOMMANDS=1 in your
+# environment to enable it.  Set time_in_prompt to show the time of the last
+# command in the prompt, too.
+time_commands = bool(os.environ.get('PYTHONTIMECOMMANDS'))
+slow_command_time = 1.0
+slow_command_log = os.path.join(user_dir, "slow_commands")
+time_in_prompt = 0
+
+# Start new sessions by forking a server that has run this file already (see
+# zygote.py).  Set PYTHONZYGOTE=1 in your environment to enable it, and put
+# the modules that take long to import in zygote_preload.
+zygote_mode = bool(os.environ.get('PYTHONZYGOTE'))
+zygote_preload = []
+
 # Functions automatically added to the builtins namespace so that you can
 # use them in the debugger and other unusual environments
 autobuiltins = ['edit', 'which', 'ls', 'cd', 'mv', 'cp', 'rm', 'help', 'rmdir',
@@ -123,7 +180,16 @@ if os.environ[ 'TERM' ] in [ 'xterm', 'vt100' ]:
         # Set up colorized tracebacks
         # Make sure to do this *before* installing LazyPython
         import ultraTB
-        sys.excepthook = ultraTB.ColorTB()
+        if verbose_tracebacks:
+            sys.excepthook = ultraTB.VerboseTB(dump_dir=crash_dir,
+                                               release=release_frames)
+        else:
+            sys.excepthook = ultraTB.ColorTB(release=release_frames)
+        if repeat_window:
+            sys.excepthook = ultraTB.RepeatFilter(sys.excepthook,
+                                                  window=repeat_window)
+        from ultraTB import pm
+        autobuiltins.append('pm')
     except ImportError:
         pass
 
@@ -137,17 +203,42 @@ except ImportError:
     
 # Pretty-print at the command prompt for more readable dicts and lists.
 from pprint import pprint
-import __builtin__
-def myhook(value, show=pprint, bltin=__builtin__):
-    if value is not None:
-        bltin._ = value
-        show(value)
+try:
+    # Keep the results, so they can be used again as _1, _2, ... or out[n]
+    import workspace
+    from workspace import who, whos, save_session, load_session
+    workspace.session_dir = session_dir
+    out = workspace.OutputCache(output_cache_size, output_cache_bytes)
+    autobuiltins.extend(['out', 'who', 'whos', 'save_session',
+                         'load_session'])
+    if save_session_at_exit:
+        import atexit
+        atexit.register(save_session)
+        del atexit
+    def myhook(value, show=pprint, cache=out):
+        cache.displayhook(value, show)
+except ImportError:
+    import __builtin__
+    def myhook(value, show=pprint, bltin=__builtin__):
+        if value is not None:
+            bltin._ = value
+            show(value)
+    del __builtin__
 sys.displayhook = myhook
-del __builtin__
 
 try:
     # Try to set up command history completion/saving/reloading
     import readline, atexit, rlcompleter
+    try:
+        # Faster completion, with filenames and module names.  The module
+        # index is built in the background so it doesn't delay the prompt.
+        import completer
+        module_index = completer.ModuleIndex(module_index_file)
+        module_index.update_in_background()
+        readline.set_completer(
+            completer.Completer(modules=module_index).complete)
+    except ImportError:
+        pass
     readline.parse_and_bind('tab: complete')
     try:
         readline.read_history_file(histfile)
@@ -165,6 +256,41 @@ try:
 except ImportError:
     pass
 
+##### Search the documentation of every module without importing it #####
+try:
+    import docindex
+    doc_index = docindex.DocIndex(doc_index_file, help_cache_dir)
+    doc_index.update_in_background()
+    docindex.index = doc_index
+    from docindex import apropos, help
+    autobuiltins.append('apropos')
+except ImportError:
+    pass
+
+##### Run coroutines on an event loop that lives as long as the session #####
+try:
+    import eventloop
+    if eventloop.asyncio is not None:
+        from eventloop import await
+        autobuiltins.append('await')
+except ImportError:
+    pass
+
+##### Spread work over all processors #####
+try:
+    from parallel import pmap, imap
+    autobuiltins.extend(['pmap', 'imap'])
+except ImportError:
+    pass
+
+##### Run shell commands as background jobs #####
+try:
+    from jobcontrol import bg, jobs, fg, wait, spawn as _spawn
+    autobuiltins.extend(['bg', 'jobs', 'fg', 'wait'])
+except ImportError:
+    def _spawn(cmd):
+        return subprocess.Popen(cmd, shell=True)
+
 ##### Make reload work recursively #####
 try:
     import __builtin__, deep_reload
@@ -185,7 +311,14 @@ def edit(object, editor=EDITOR):
     if type(object) is type(""):
         fname = object; lineno = 1
         print editor % locals()
-        subprocess.Popen(editor % locals(), shell=True)
+        _spawn(editor % locals())
+        return
+    if isinstance(object, tuple) and len(object) >= 2 and \
+            type(object[0]) is type(""):
+        # A (filename, lineno, ...) tuple, like the matches grep() finds
+        fname, lineno = object[:2]
+        print editor % locals()
+        _spawn(editor % locals())
         return
     
     ret = which(object)
@@ -196,7 +329,7 @@ def edit(object, editor=EDITOR):
     if fname[-4:] == '.pyc' or fname[-4:] == '.pyo':
         fname = fname[:-1]
     print editor % locals()
-    subprocess.Popen(editor % locals(), shell=True)
+    _spawn(editor % locals())
 
 def timed(func):
     @functools.wraps(func)
@@ -254,7 +387,7 @@ def _ls(options, *files):
         args = os.curdir
     else :
         args = ' '.join(files)
-    subprocess.Popen('ls %s %s' % (options, args), shell=True)
+    _spawn('ls %s %s' % (options, args))
 
 def ls(*files):
     """Same as 'ls -aF'
@@ -277,6 +410,34 @@ argument)
     """
     _ls('-aRF', *files)
 
+try:
+    import search
+    def grep(pattern, *files):
+        """Search files, and directories recursively, for a regular
+        expression.
+        Usage:  >>> grep('pattern' [, 'file', ...])  (brackets mean [optional]
+argument)
+        Returns the matching lines as (filename, lineno, line), numbered so
+        that edit(_[n]) opens the file at the n-th one.  Ctrl-C stops the
+        search and returns what was found so far.
+        """
+        matches = search.Matches()
+        try:
+            for match in search.igrep(pattern, _glob(files or (os.curdir,))):
+                matches.append(match)
+        except KeyboardInterrupt:
+            print '(interrupted)'
+        return matches
+    autobuiltins.append('grep')
+except ImportError:
+    pass
+
+try:
+    from diskusage import du
+    autobuiltins.append('du')
+except ImportError:
+    pass
+
 mkdir = os.mkdir
 
 def rm(*args):
@@ -303,7 +464,7 @@ def rmdir(directory):
         #directory wasn't empty
         answer = raw_input(directory+" isn't empty. Delete anyway?[n] ")
         if answer and answer[0] in 'Yy':
-            subprocess.Popen('rm -rf %s' % directory, shell=True)
+            _spawn('rm -rf %s' % directory)
             print directory + ' Deleted.'
         else:
             print directory + ' Unharmed.'
@@ -452,14 +613,26 @@ def syspath():
 
 def which(object):
     """Print the source file from which a module, class, function, or method 
-    was imported.
+    was imported.  Modules can also be given by name, without importing them.
     
     Usage:    >>> which(mysteryObject)
+              >>> which('package.module')
     Returns:  Tuple with (file_name, line_number) of source file, or None if
               no source file exists
     Alias:    whence
     """
     object_type = type(object)
+    if object_type is types.StringType and module_index is not None:
+        try:
+            fname = module_index.find(object)
+        except ImportError, detail:
+            print detail
+            return None
+        if fname is None:
+            print 'Built-in module.'
+            return None
+        print 'Module from', fname
+        return (fname, 1)
     if object_type is types.ModuleType:
         if hasattr(object, '__file__'):
             print 'Module from', object.__file__
@@ -494,3 +667,53 @@ whence = which
 import __builtin__
 for n in autobuiltins:
     exec '__builtin__.__dict__["%s"] = %s' % (n,n) in globals()
+del n
+
+# Fork the zygote server.  The sessions it forks continue from here.
+if zygote_mode:
+    try:
+        import zygote
+        for _name in zygote_preload:
+            __import__(_name)
+        if module_index is not None:
+            zygote.at_fork.append(module_index.forked)
+        if doc_index is not None:
+            zygote.at_fork.append(doc_index.forked)
+        # Give every session its own session name, shell, workers, event
+        # loop and crash dump file
+        for _name in ('workspace', 'parallel', 'eventloop'):
+            if sys.modules.get(_name) is not None:
+                zygote.at_fork.append(sys.modules[_name].forked)
+        if sys.modules.get('LazyPython') is not None:
+            zygote.at_fork.append(sys.modules['LazyPython']._shell.forked)
+        _hook = getattr(sys.excepthook, '_orig_ehook', sys.excepthook)
+        if hasattr(_hook, 'forked'):
+            zygote.at_fork.append(_hook.forked)
+        zygote.start_server(histfile=histfile)
+    except ImportError:
+        pass
+
+# Take over the interactive session if LazyPython's console or timing is
+# wanted.  This has to come last, the interpreter exits when the console does.
+_timer = None
+if time_commands:
+    try:
+        import timing
+        _timer = timing.CommandTimer(slow_command_time, slow_command_log)
+        if time_in_prompt:
+            sys.ps1 = timing.TimedPrompt(sys.ps1, _timer)
+    except ImportError:
+        pass
+if lazy_console and hasattr(sys.excepthook, 'translate'):
+    from LazyPython import LazyConsole
+
+# Leave everything defined so far out of who() and whos()
+try:
+    workspace.hide(globals())
+except NameError:
+    pass
+
+if lazy_console and hasattr(sys.excepthook, 'translate'):
+    LazyConsole(sys.excepthook, timer=_timer).interact()
+elif _timer is not None:
+    timing.TimedConsole(_timer).interact()
@@ -0,0 +1,108 @@
+"""
+timing.py -- Time every command typed at the prompt.
+
+Commands taking longer than a threshold get their time printed after them,
+and are added to a log file together with the time they were run and the
+current directory, so slow commands can be found again later:
+    >>> import time; time.sleep(2)
+    [2.00 s]
+
+The plain interpreter has no way to find out when a command starts, so this
+needs a console of our own.  Run this at the end of your $PYTHONSTARTUP file:
+    import timing
+    timing.TimedConsole(timing.CommandTimer(1.0, '/path/to/log')).interact()
+The interpreter exits when the console does.  LazyPython's LazyConsole
+takes a CommandTimer, too.  To show the time of the last command in the
+prompt as well:
+    sys.ps1 = timing.TimedPrompt(sys.ps1, timer)
+"""
+
+import os, sys, time, code, __main__
+
+class CommandTimer:
+    """Times commands, reporting and logging those taking at least
+    threshold seconds."""
+    def __init__(self, threshold=1.0, logfile=None):
+        self.threshold = threshold
+        self.logfile = logfile
+        # The time taken by the last command
+        self.last = None
+
+    def run(self, source, func, *args):
+        """Call func(*args) as the command source and time it."""
+        start = time.time()
+        try:
+            return func(*args)
+        finally:
+            self.record(source, time.time() - start)
+
+    def record(self, source, elapsed):
+        self.last = elapsed
+        if self.threshold is None or elapsed < self.threshold:
+            return
+        sys.stderr.write('[%.2f s]\n' % elapsed)
+        if self.logfile:
+            self.log(source, elapsed)
+
+    def log(self, source, elapsed):
+        try:
+            cwd = os.getcwd()
+        except OSError:
+            cwd = '?'
+        line = '%s\t%.3f\t%s\t%s\n' % (time.strftime('%Y-%m-%d %H:%M:%S'),
+                                       elapsed, cwd,
+                                       source.rstrip().replace('\n', '\\n'))
+        try:
+            fp = open(self.logfile, 'a')
+            try:
+                fp.write(line)
+            finally:
+                fp.close()
+        except IOError:
+            pass
+
+
+class TimedPrompt:
+    """A prompt showing how long the last command took."""
+    def __init__(self, prompt, timer):
+        self.prompt = prompt
+        self.timer = timer
+
+    def __str__(self):
+        if self.timer.last is None:
+            return str(self.prompt)
+        return '[%.3f] %s' % (self.timer.last, self.prompt)
+
+
+class TimedConsole(code.InteractiveConsole):
+    """An interactive console that times every command with timer.  It
+    runs in __main__ and reports errors with sys.excepthook, just like the
+    interpreter's own prompt."""
+    def __init__(self, timer, locals=None, filename="<stdin>"):
+        if locals is None:
+            locals = __main__.__dict__
+        code.InteractiveConsole.__init__(self, locals, filename)
+        self.timer = timer
+
+    def interact(self, banner=''):
+        code.InteractiveConsole.interact(self, banner)
+        raise SystemExit
+
+    def runsource(self, source, filename="<input>", symbol="single"):
+        start = time.time()
+        more = code.InteractiveConsole.runsource(self, source, filename,
+                                                 symbol)
+        if not more:
+            self.timer.record(source, time.time() - start)
+        return more
+
+    def showtraceback(self):
+        tp, val, tb = sys.exc_info()
+        sys.last_type, sys.last_value, sys.last_traceback = tp, val, tb
+        # Skip our own frame
+        sys.excepthook(tp, val, tb and tb.tb_next)
+
+    def showsyntaxerror(self, filename=None):
+        tp, val, tb = sys.exc_info()
+        sys.last_type, sys.last_value, sys.last_traceback = tp, val, tb
+        sys.excepthook(tp, val, None)
@@ -30,6 +30,25 @@ Installation instructions for ColorTB:
     import sys,ultraTB
     sys.excepthook = ultraTB.VerboseTB()
 
+To keep the reports of long-running programs, VerboseTB can save them to
+crash dump files, which can be shown again later in either style:
+    sys.excepthook = ultraTB.VerboseTB(dump_dir='/path/to/crashes')
+    ...
+    ultraTB.show_dump('/path/to/crashes/crash-20011021-145145-1234.jsonl')
+
+Keeping sys.last_traceback around for pdb.pm() keeps every frame's locals
+alive, which can be a lot of memory.  Either hook created with release=1
+instead keeps a snapshot of the frames (source lines and bounded reprs of
+their locals), lets the traceback go, and pm() browses the snapshot:
+    sys.excepthook = ultraTB.ColorTB(release=1)
+    ...
+    ultraTB.pm()
+
+A loop or callback that hits the same error again and again would print a
+traceback every time.  Wrapping the hook in a RepeatFilter prints the first
+one and then just counts the repeats, printing their number now and then:
+    sys.excepthook = ultraTB.RepeatFilter(ultraTB.ColorTB())
+
 * Cohabitating with LazyPython
 Either module will work in conjunction with my LazyPython hack if you 
 install it *before* you install LazyPython.  e.g.:
@@ -43,7 +62,8 @@ library module "traceback.py" and Ka-Ping Yee's "cgitb.py".
 
 # Thanks to William McVey <wam@cisco.com> for the xterm-conditional code.
 
-import sys, traceback, types, os
+import sys, traceback, types, os, time, inspect, cmd
+from repr import Repr
 
 __version__ = "0.3"
 __author__ = "Nathaniel Gray <n8gray@caltech.edu>"
@@ -119,21 +139,103 @@ class Colors:
        excNameColor = Red
 
 class ColorTB:
+    # Runs of more than this many identical frames (as produced by infinite
+    # recursion) are collapsed into a single line
+    max_repeats = 3
+
+    def __init__(self, release=0):
+        # If set, keep a snapshot for pm() instead of the real frames
+        self.release = release
+
     def __call__(self, etype, value, tb):
-        print>>sys.stderr, Colors.toplineColor + '-'*60 + Colors.Normal
+        # Build the whole report first and write it at once, which is a lot
+        # faster on slow terminals than a write per line.
+        sys.stderr.write(self.text(etype, value, tb))
+        if self.release:
+            release(VerboseTB().snapshot(etype, value, tb, locals=1))
+
+    def text(self, etype, value, tb):
+        """Return the report for a traceback as text."""
+        out = [Colors.toplineColor + '-'*60 + Colors.Normal + '\n']
         if tb:
-            print>>sys.stderr, 'Traceback %s(most recent call last)%s:' % \
-                                (Colors.normalEm, Colors.Normal)
-            elist = traceback.extract_tb(tb)
-            slist = self._format_list( elist )
-            for line in slist:
-                print>>sys.stderr, line,
-            #sys.stderr.writelines( slist )
+            out.append('Traceback %s(most recent call last)%s:\n' % \
+                       (Colors.normalEm, Colors.Normal))
+            elist = self._extract_tb(tb)
+            out.extend(self._format_list(elist))
         lines = self._format_exception_only(etype, value)
         for line in lines[:-1]:
-            print>>sys.stderr, " "+line,
-        print>>sys.stderr, lines[-1],
-        
+            out.append(" " + line)
+        out.append(lines[-1])
+        return ''.join(out)
+
+    def render(self, snapshot):
+        """Return the report for a traceback snapshot taken by
+        VerboseTB.snapshot()."""
+        out = [Colors.toplineColor + '-'*60 + Colors.Normal + '\n']
+        elist = []
+        for frame in snapshot['frames']:
+            line = None
+            if frame['index'] is not None and frame['lines']:
+                line = frame['lines'][frame['index']].strip()
+            elist.append((frame['file'], frame['lnum'], frame['func'], line))
+        elist.extend([tuple(entry) for entry in snapshot['brief']])
+        if elist:
+            out.append('Traceback %s(most recent call last)%s:\n' % \
+                       (Colors.normalEm, Colors.Normal))
+            out.extend(self._format_list(elist))
+        stype = Colors.excNameColor + snapshot['type'] + Colors.Normal
+        if snapshot['syntax']:
+            lines = self._format_exception_parts(stype, snapshot['syntax'][4],
+                                                 snapshot['syntax'][:4])
+        else:
+            lines = self._format_exception_parts(stype, snapshot['value'])
+        for line in lines[:-1]:
+            out.append(" " + line)
+        out.append(lines[-1])
+        return ''.join(out)
+
+    def _extract_tb(self, tb):
+        """Like traceback.extract_tb, but only checks every source file once
+        instead of once per frame, and replaces runs of identical frames by
+        max_repeats frames and a (None, count, None, None) entry telling how
+        many were left out."""
+        import linecache
+        frames = []
+        while tb is not None:
+            code = tb.tb_frame.f_code
+            frames.append((code.co_filename, tb.tb_lineno, code.co_name))
+            tb = tb.tb_next
+        checked = {}
+        extracted = []
+        i = 0
+        while i < len(frames):
+            filename, lineno, name = frames[i]
+            j = i + 1
+            while j < len(frames) and frames[j] == frames[i]:
+                j = j + 1
+            if not checked.has_key(filename):
+                linecache.checkcache(filename)
+                checked[filename] = 1
+            line = linecache.getline(filename, lineno)
+            if line:
+                line = line.strip()
+            else:
+                line = None
+            entry = (filename, lineno, name, line)
+            count = j - i
+            if count <= self.max_repeats:
+                extracted.extend([entry] * count)
+            elif j < len(frames):
+                extracted.extend([entry] * self.max_repeats)
+                extracted.append((None, count - self.max_repeats, None, None))
+            else:
+                # Keep the innermost frame last, it gets emphasized
+                extracted.extend([entry] * (self.max_repeats - 1))
+                extracted.append((None, count - self.max_repeats, None, None))
+                extracted.append(entry)
+            i = j
+        return extracted
+
     def _format_list(self, extracted_list):
         """Format a list of traceback entry tuples for printing.
 
@@ -148,6 +250,11 @@ class ColorTB:
         """
         list = []
         for filename, lineno, name, line in extracted_list[:-1]:
+            if filename is None:
+                # lineno is the number of collapsed frames
+                list.append('  %s[Previous frame repeated %d more times]%s\n'
+                            % (Colors.emColor, lineno, Colors.Normal))
+                continue
             item = '  File %s"%s"%s, line %s%d%s, in %s%s%s\n' % \
                     (Colors.filenameColor, filename, Colors.Normal, 
                      Colors.linenoColor, lineno, Colors.Normal,
@@ -182,48 +289,57 @@ class ColorTB:
         
         Also lifted nearly verbatim from traceback.py
         """
-        list = []
         if type(etype) == types.ClassType:
             stype = Colors.excNameColor + etype.__name__ + Colors.Normal
         else:
             stype = etype  # String exceptions don't get special coloring
         if value is None:
-            list.append( str(stype) + '\n')
-        else:
-            if etype is SyntaxError:
-                try:
-                    msg, (filename, lineno, offset, line) = value
-                except:
-                    pass
-                else:
-                    if not filename: filename = "<string>"
-                    list.append('%s  File %s"%s"%s, line %s%d%s\n' % \
-                            (Colors.normalEm,
-                             Colors.filenameColorEm, filename, Colors.normalEm,
-                             Colors.linenoColorEm, lineno, Colors.Normal  ))
-                    if line is not None:
-                        i = 0
-                        while i < len(line) and line[i].isspace():
-                            i = i+1
-                        list.append('%s    %s%s\n' % (Colors.lineColor,
-                                                      line.strip(), 
-                                                      Colors.Normal))
-                        if offset is not None:
-                            s = '    '
-                            for c in line[i:offset-1]:
-                                if c.isspace():
-                                    s = s + c
-                                else:
-                                    s = s + ' '
-                            list.append('%s%s^%s\n' % (Colors.caretColor, s,
-                                                       Colors.Normal) )
-                        value = msg
-            s = self._some_str(value)
-            if s:
-                list.append('%s%s:%s %s\n' % (str(stype), Colors.excNameColor,
-                                              Colors.Normal, s))
+            return [str(stype) + '\n']
+        syntax = None
+        if etype is SyntaxError:
+            try:
+                msg, (filename, lineno, offset, line) = value
+            except:
+                pass
             else:
-                list.append('%s\n' % str(stype))
+                syntax = (filename, lineno, offset, line)
+                value = msg
+        return self._format_exception_parts(str(stype), self._some_str(value),
+                                            syntax)
+
+    def _format_exception_parts(self, stype, s, syntax=None):
+        """Format the exception part of a traceback from the exception type
+        name, its message and, for SyntaxErrors, a tuple (filename, lineno,
+        offset, line)."""
+        list = []
+        if syntax is not None:
+            filename, lineno, offset, line = syntax
+            if not filename: filename = "<string>"
+            list.append('%s  File %s"%s"%s, line %s%d%s\n' % \
+                    (Colors.normalEm,
+                     Colors.filenameColorEm, filename, Colors.normalEm,
+                     Colors.linenoColorEm, lineno, Colors.Normal  ))
+            if line is not None:
+                i = 0
+                while i < len(line) and line[i].isspace():
+                    i = i+1
+                list.append('%s    %s%s\n' % (Colors.lineColor,
+                                              line.strip(), 
+                                              Colors.Normal))
+                if offset is not None:
+                    s2 = '    '
+                    for c in line[i:offset-1]:
+                        if c.isspace():
+                            s2 = s2 + c
+                        else:
+                            s2 = s2 + ' '
+                    list.append('%s%s^%s\n' % (Colors.caretColor, s2,
+                                               Colors.Normal) )
+        if s:
+            list.append('%s%s:%s %s\n' % (stype, Colors.excNameColor,
+                                          Colors.Normal, s))
+        else:
+            list.append('%s\n' % stype)
         return list
 
     def _some_str(self, value):
@@ -233,77 +349,404 @@ class ColorTB:
         except:
             return '<unprintable %s object>' % type(value).__name__
 
+class SafeRepr(Repr):
+    """A repr() for inspecting values of unknown cost.
+
+    Containers and strings are abbreviated like pydoc does it, results are
+    cut to maxresult characters, and user-defined __repr__ methods are called
+    at most user_reprs times.  If one of them takes longer than user_time
+    seconds, or the deadline (a time.time() value) has passed, no more user
+    code is run and objects are shown as <Type object at address>.  So are
+    other objects with more than maxsize items or bytes, whose repr() would
+    take time and memory in proportion to their size.
+    """
+    def __init__(self, user_reprs=20, user_time=0.1, maxresult=200,
+                 deadline=None):
+        Repr.__init__(self)
+        self.maxlist = self.maxtuple = 20
+        self.maxdict = 10
+        self.maxstring = self.maxother = 100
+        self.maxresult = maxresult
+        self.maxsize = 10000
+        self.user_reprs = user_reprs
+        self.user_time = user_time
+        self.deadline = deadline
+
+    def repr(self, x):
+        s = Repr.repr(self, x)
+        if len(s) > self.maxresult:
+            s = s[:self.maxresult - 3] + '...'
+        return s
+
+    def repr1(self, x, level):
+        if type(x) in _scalar_types:
+            return Repr.repr1(self, x, level)
+        if self.deadline is not None and time.time() > self.deadline:
+            return '<...>'
+        for base in _container_types:
+            if isinstance(x, base) and type(x) is not base:
+                # Subclasses like defaultdict get the bounded repr of their
+                # base, unless they have a __repr__ of their own and are
+                # small enough for it
+                if not _has_user_repr(x) or base.__len__(x) > self.maxsize:
+                    return '%s(%s)' % (type(x).__name__, getattr(
+                        self, 'repr_' + base.__name__)(x, level))
+                break
+        if isinstance(x, BaseException) and not _has_user_repr(x) and \
+                isinstance(getattr(x, 'args', None), tuple):
+            # Like BaseException.__repr__, with abbreviated arguments
+            return type(x).__name__ + self.repr_tuple(x.args, level)
+        typename = type(x).__name__.replace(' ', '_')
+        if _has_user_repr(x) or not hasattr(self, 'repr_' + typename):
+            return self.repr_instance(x, level)
+        return Repr.repr1(self, x, level)
+
+    def repr_instance(self, x, level):
+        if not _has_user_repr(x):
+            if _size(x) > self.maxsize:
+                return _plain_repr(x)
+            s = repr(x)
+        elif self.user_reprs <= 0 or \
+                (self.deadline is not None and time.time() > self.deadline):
+            return _plain_repr(x)
+        else:
+            self.user_reprs = self.user_reprs - 1
+            start = time.time()
+            try:
+                s = repr(x)
+            except:
+                s = '<unprintable %s>' % _plain_repr(x)[1:-1]
+            if time.time() - start > self.user_time:
+                self.user_reprs = 0
+        if len(s) > self.maxother:
+            i = max(0, (self.maxother-3)//2)
+            j = max(0, self.maxother-3-i)
+            s = s[:i] + '...' + s[len(s)-j:]
+        return s
+
+    def repr_unicode(self, x, level):
+        return self.repr_str(x, level)
+
+    def repr_bytearray(self, x, level):
+        if len(x) <= self.maxstring:
+            return repr(x)
+        return 'bytearray(%s...)' % repr(str(x[:self.maxstring]))
+
+    def repr_long(self, x, level):
+        if x.bit_length() > 4 * self.maxsize:
+            return '<long of about %d digits>' % int(x.bit_length() * 0.30103)
+        return Repr.repr_long(self, x, level)
+
+    def repr_dict(self, x, level):
+        n = len(x)
+        if n == 0: return '{}'
+        if level <= 0: return '{...}'
+        pieces = []
+        for key in self._some(x, self.maxdict):
+            pieces.append('%s: %s' % (self.repr1(key, level - 1),
+                                      self.repr1(dict.__getitem__(x, key),
+                                                 level - 1)))
+        if n > self.maxdict: pieces.append('...')
+        return '{%s}' % ', '.join(pieces)
+
+    def repr_set(self, x, level):
+        return self._repr_iterable(self._some(x, self.maxset), level,
+                                   'set([', '])', self.maxset)
+
+    def repr_frozenset(self, x, level):
+        return self._repr_iterable(self._some(x, self.maxfrozenset), level,
+                                   'frozenset([', '])', self.maxfrozenset)
+
+    def _some(self, x, count):
+        # The first count items of x, sorted unless there are too many
+        if len(x) <= self.maxsize:
+            try:
+                return _Sized(sorted(x)[:count], len(x))
+            except Exception:
+                pass
+        items = []
+        for item in x:
+            if len(items) >= count:
+                break
+            items.append(item)
+        return _Sized(items, len(x))
+
+class _Sized(list):
+    # Some items of a bigger collection, which _repr_iterable takes for all
+    def __init__(self, items, size):
+        list.__init__(self, items)
+        self.size = size
+    def __len__(self):
+        return self.size
+
+def _size(x):
+    # The number of items or bytes of x, or 0.  Only the methods of the
+    # first base class written in C are used, so no Python code runs.
+    if type(x) is types.InstanceType:
+        return 0
+    for base in inspect.getmro(type(x)):
+        if not base.__flags__ & _HEAPTYPE:
+            break
+    size = 0
+    try:
+        size = base.__len__(x)
+    except Exception:
+        pass
+    nbytes = base.__dict__.get('nbytes')
+    if hasattr(nbytes, '__get__'):
+        try:
+            nbytes = nbytes.__get__(x, base)
+            if isinstance(nbytes, (int, long)):
+                size = max(size, nbytes)
+        except Exception:
+            pass
+    return size
+
+# Py_TPFLAGS_HEAPTYPE, set for classes defined in Python
+_HEAPTYPE = 1 << 9
+
+def _message(value, saferepr):
+    # str(value), cut to saferepr.maxresult characters.  Arguments too big
+    # to convert in full are shown with saferepr, like str() would show
+    # them with repr().
+    args = getattr(value, 'args', None)
+    if isinstance(value, BaseException) and isinstance(args, tuple) and \
+            not isinstance(getattr(type(value), '__str__', None),
+                           types.MethodType) and \
+            [arg for arg in args if _size(arg) > saferepr.maxsize]:
+        if len(args) == 1:
+            if isinstance(args[0], basestring) and \
+                    not isinstance(value, KeyError):
+                s = ColorTB()._some_str(args[0][:saferepr.maxresult])
+            else:
+                s = saferepr.repr(args[0])
+        else:
+            s = saferepr.repr(args)
+    else:
+        s = ColorTB()._some_str(value)
+    if len(s) > saferepr.maxresult:
+        s = s[:saferepr.maxresult - 3] + '...'
+    return s
+
+# Values that are always cheap to show
+_scalar_types = (types.NoneType, types.BooleanType, types.IntType,
+                 types.LongType, types.FloatType, types.ComplexType)
+# Containers whose subclasses are shown like them
+_container_types = (dict, list, tuple, set, frozenset)
+
+def _plain_repr(x):
+    # What object.__repr__ would say, without running any user code
+    if type(x) is types.InstanceType:
+        name = x.__class__.__name__ + ' instance'
+    else:
+        name = type(x).__name__ + ' object'
+    return '<%s at %#x>' % (name, id(x))
+
+def _has_user_repr(x):
+    # Whether repr(x) runs a __repr__ written in Python
+    if type(x) is types.InstanceType:
+        for klass in inspect.getmro(x.__class__):
+            if klass.__dict__.has_key('__repr__'):
+                return True
+        return False
+    return isinstance(getattr(type(x), '__repr__', None), types.MethodType)
+
+# Names used in a source line, keyed by (file, line number, line)
+_names_cache = {}
+
+def _line_names(file, lnum):
+    """Return the names used in the logical source line starting at
+    lnum, tokenizing each line only once."""
+    import keyword, tokenize, linecache
+    key = (file, lnum, linecache.getline(file, lnum))
+    try:
+        return _names_cache[key]
+    except KeyError:
+        pass
+    names = []
+    def tokeneater(type, token, start, end, line,
+                   names=names, kwlist=keyword.kwlist,
+                   NAME=tokenize.NAME, NEWLINE=tokenize.NEWLINE):
+        if type == NAME and token not in kwlist:
+            if token not in names: names.append(token)
+        if type == NEWLINE: raise IndexError
+    def linereader(file=file, lnum=[lnum], getline=linecache.getline):
+        line = getline(file, lnum[0])
+        lnum[0] = lnum[0] + 1
+        return line
+
+    try:
+        tokenize.tokenize(linereader, tokeneater)
+    except (IndexError, tokenize.TokenError): pass
+    if len(_names_cache) > 1000:
+        _names_cache.clear()
+    _names_cache[key] = names
+    return names
+
 class VerboseTB:
     """A port of Ka-Ping Yee's cgitb.py module that outputs color text instead
-    of HTML.  Requires inspect and pydoc.  Crazy, man."""
+    of HTML.  Requires inspect.  Crazy, man.
 
-    def text(self, etype, evalue, etb, context=5):
-        """Return a nice text document describing the traceback."""
-        import sys, os, types, string, time, traceback
-        import keyword, tokenize, linecache, inspect, pydoc
+    Inspecting the variables of a frame can be expensive, so the work is
+    limited: values are shown with SafeRepr, each frame gets frame_time
+    seconds and the whole report total_time seconds, after which the
+    remaining frames are shown like ColorTB does.
 
-        if type(etype) is types.ClassType:
-            etype = etype.__name__
-        # Header with the exception type, python version, and date
-        pyver = 'Python ' + string.split(sys.version)[0] + ': ' + sys.executable
-        date = time.ctime(time.time())
-        exc = "%s%s%s" % (Colors.excNameColor, str(etype), Colors.Normal)
+    The report is built from a snapshot (see snapshot()), a plain data
+    structure holding the frames, source excerpts and variable reprs.  If
+    dump_dir is given, every snapshot is also saved there (see CrashDumper).
+    If release is set, the snapshot also gets the locals of every frame and
+    is kept for pm(), while the traceback itself is let go (see release()).
+    """
+    # Longest value shown, and longest exception message
+    max_value_len = 200
+    max_message_len = 2000
+    # Number of user-defined __repr__ methods called per report
+    max_user_reprs = 20
+    # Stop calling user-defined __repr__ methods after one this slow
+    value_time = 0.1
+    # Time budgets for each frame and for the whole report, in seconds
+    frame_time = 0.5
+    total_time = 2.0
+    # Number of locals per frame kept in snapshots taken with locals=1
+    max_locals = 50
 
-        head = '%s%s%s\n%s%s%s\n%s' % (Colors.toplineColor, '-'*75, Colors.Normal,
-                                       exc, ' '*(75-len(str(etype))-len(pyver)),
-                                       pyver, string.rjust(date, 75) )
-        head += "\nA problem occured in a Python script.  Here is the sequence of function"\
-                "\ncalls leading up to the error, with the most recent (innermost) call last."
+    def __init__(self, dump_dir=None, release=0):
+        self.release = release
+        if dump_dir:
+            self.dumper = CrashDumper(dump_dir)
+        else:
+            self.dumper = None
 
-        indent = ' '*6
+    def forked(self):
+        """Call this in a forked process."""
+        if self.dumper is not None:
+            self.dumper.forked()
+
+    def snapshot(self, etype, evalue, etb, context=5, locals=0):
+        """Return a dictionary describing the traceback, which holds nothing
+        but strings, numbers, lists and dictionaries.  With locals, every
+        frame also gets the reprs of (up to max_locals of) its locals."""
+        import sys, os, string
+
+        want_locals = locals
         frames = []
-        records = inspect.getinnerframes(etb, context)
-        for frame, file, lnum, func, lines, index in records:
+        brief = []
+        start = time.time()
+        saferepr = SafeRepr(self.max_user_reprs, self.value_time,
+                            self.max_value_len)
+        srepr = saferepr.repr
+        tb = etb
+        while tb is not None:
+            now = time.time()
+            if now - start > self.total_time:
+                # Out of time, keep only what ColorTB shows for the rest
+                brief = [list(entry) for entry in ColorTB()._extract_tb(tb)]
+                break
+            saferepr.deadline = min(now + self.frame_time,
+                                    start + self.total_time)
+            frame = tb.tb_frame
+            file, lnum, func, lines, index = inspect.getframeinfo(tb, context)
+            tb = tb.tb_next
+
             file = file and os.path.abspath(file) or '?'
-            link = Colors.filenameColorEm + file + Colors.Normal
             args, varargs, varkw, locals = inspect.getargvalues(frame)
             if func == '?':
-                call = ''
+                call = None
             else:
-	        def eqrepr(value, repr=pydoc.text.repr): return '=' + repr(value)
-                call = 'in %s%s%s%s%s' % (Colors.vNameColor, 
-                                          func, Colors.valColorEm, 
-                                          inspect.formatargvalues( 
-                                                args, varargs, varkw, locals, 
-                                                formatvalue=eqrepr),
-                                          Colors.Normal)
-
-            names = []
-            def tokeneater(type, token, start, end, line,
-                           names=names, kwlist=keyword.kwlist,
-		           NAME=tokenize.NAME, NEWLINE=tokenize.NEWLINE):
-                if type == NAME and token not in kwlist:
-                    if token not in names: names.append(token)
-                if type == NEWLINE: raise IndexError
-            def linereader(file=file, lnum=[lnum], getline=linecache.getline):
-                line = getline(file, lnum[0])
-                lnum[0] = lnum[0] + 1
-                return line
+                def eqrepr(value, repr=srepr): return '=' + repr(value)
+                call = inspect.formatargvalues(args, varargs, varkw, locals,
+                                               formatvalue=eqrepr)
 
-            try:
-                tokenize.tokenize(linereader, tokeneater)
-            except IndexError: pass
-            lvals = []
-            for name in names:
+            # (name, value or None if undefined, whether it's a global)
+            variables = []
+            for name in _line_names(file, lnum):
                 if name in frame.f_code.co_varnames:
                     if locals.has_key(name):
-                        value = pydoc.text.repr(locals[name])
+                        variables.append([name, srepr(locals[name]), 0])
                     else:
-                        value = '%sundefined%s' % (Colors.emColor, Colors.Normal)
-                    name = '%s%s%s' % (Colors.vNameColor, name, Colors.Normal)
+                        variables.append([name, None, 0])
                 else:
                     if frame.f_globals.has_key(name):
-                        value = pydoc.text.repr(frame.f_globals[name])
+                        variables.append([name, srepr(frame.f_globals[name]),
+                                          1])
                     else:
-                        value = '%sundefined%s' % (Colors.emColor, Colors.Normal)
+                        variables.append([name, None, 1])
+
+            record = {'file': file, 'lnum': lnum, 'func': func,
+                      'call': call, 'lines': lines or [],
+                      'index': index, 'variables': variables}
+            if want_locals:
+                names = [name for name in locals.keys()
+                         if not name.startswith('__')]
+                names.sort()
+                record['locals'] = [[name, srepr(locals[name])]
+                                    for name in names[:self.max_locals]]
+            frames.append(record)
+
+        syntax = None
+        if isinstance(evalue, SyntaxError):
+            try:
+                msg, (filename, lineno, offset, line) = evalue
+            except:
+                pass
+            else:
+                syntax = [filename, lineno, offset, line, msg]
+        attributes = []
+        if type(evalue) is types.InstanceType:
+            for name in dir(evalue):
+                attributes.append([name, srepr(getattr(evalue, name))])
+
+        saferepr.maxresult = self.max_message_len
+        saferepr.deadline = None
+        return {'type': getattr(etype, '__name__', str(etype)),
+                'value': _message(evalue, saferepr),
+                'syntax': syntax,
+                'attributes': attributes,
+                'python': 'Python ' + string.split(sys.version)[0] + ': ' +
+                          sys.executable,
+                'time': time.time(),
+                'frames': frames,
+                'brief': brief}
+
+    def render(self, snapshot):
+        """Return a nice text document describing a traceback snapshot."""
+        import string
+
+        etype = snapshot['type']
+        # Header with the exception type, python version, and date
+        pyver = snapshot['python']
+        date = time.ctime(snapshot['time'])
+        exc = "%s%s%s" % (Colors.excNameColor, etype, Colors.Normal)
+
+        head = '%s%s%s\n%s%s%s\n%s' % (Colors.toplineColor, '-'*75, Colors.Normal,
+                                       exc, ' '*(75-len(etype)-len(pyver)),
+                                       pyver, string.rjust(date, 75) )
+        head += "\nA problem occured in a Python script.  Here is the sequence of function"\
+                "\ncalls leading up to the error, with the most recent (innermost) call last."
+
+        indent = ' '*6
+        frames = []
+        for record in snapshot['frames']:
+            lnum = record['lnum']
+            link = Colors.filenameColorEm + record['file'] + Colors.Normal
+            if record['call'] is None:
+                call = ''
+            else:
+                call = 'in %s%s%s%s%s' % (Colors.vNameColor, 
+                                          record['func'], Colors.valColorEm, 
+                                          record['call'], Colors.Normal)
+
+            lvals = []
+            for name, value, isglobal in record['variables']:
+                if value is None:
+                    value = '%sundefined%s' % (Colors.emColor, Colors.Normal)
+                if isglobal:
                     name = '%sglobal%s %s%s%s' % (Colors.emColor, Colors.Normal,
                                                   Colors.vNameColor, name, 
                                                   Colors.Normal)
+                else:
+                    name = '%s%s%s' % (Colors.vNameColor, name, Colors.Normal)
                 lvals.append('%s %s= %s%s' % (name, Colors.valColorEm, value,
                                               Colors.Normal))
             if lvals:
@@ -315,9 +758,9 @@ class VerboseTB:
 
             level = link + ' ' + call + '\n'
             excerpt = []
-            if index is not None:
-                i = lnum - index
-                for line in lines:
+            if record['index'] is not None:
+                i = lnum - record['index']
+                for line in record['lines']:
                     num = ' '*(5-len(str(i))) + str(i)
                     if i == lnum:
                         # This is the line with the error
@@ -333,24 +776,380 @@ class VerboseTB:
                     i = i + 1
             frames.append(level + string.join(excerpt, ''))
 
-        exception = ['%s%s%s: %s' % (Colors.excNameColor, str(etype), 
-                                     Colors.Normal, str(evalue))]
-        if type(evalue) is types.InstanceType:
-            for name in dir(evalue):
-                value = pydoc.text.repr(getattr(evalue, name))
-                exception.append('\n%s%s = %s' % (indent, name, value))
+        if snapshot['brief']:
+            frames.append('%s(time budget used up, remaining frames '
+                          'abbreviated)%s\n' % (Colors.emColor, Colors.Normal) +
+                          string.join(ColorTB()._format_list(
+                              snapshot['brief']), ''))
+
+        exception = ['%s%s%s: %s' % (Colors.excNameColor, etype, 
+                                     Colors.Normal, snapshot['value'])]
+        for name, value in snapshot['attributes']:
+            exception.append('\n%s%s = %s' % (indent, name, value))
 
         return head + '\n\n' + string.join(frames, '\n') + '\n' + \
                 string.join(exception, '')
 
+    def text(self, etype, evalue, etb, context=5):
+        """Return a nice text document describing the traceback."""
+        return self.render(self.snapshot(etype, evalue, etb, context))
+
     def handler(self, info=None):
         import sys
         (etype, evalue, etb) = info or sys.exc_info()
-        print self.text(etype, evalue, etb)
+        snapshot = self.snapshot(etype, evalue, etb, locals=self.release)
+        print self.render(snapshot)
+        if self.dumper is not None:
+            self.dumper.dump(snapshot)
+        if self.release:
+            release(snapshot)
 
     def __call__(self, etype, evalue, etb):
         """This hook can replace sys.excepthook (for Python 2.1 or higher)."""
         self.handler((etype, evalue, etb))
+
+
+class RepeatFilter:
+    """Wraps another excepthook and keeps the same error, raised over and
+    over by a loop or a callback, from flooding the terminal.
+
+    Errors are told apart by the exception type and message and the code
+    locations of the traceback's frames.  The first occurrence is passed on
+    to the hook; repeats coming within window seconds of the previous one
+    are only counted, and a one-line summary of the counts is printed
+    interval seconds later (and at exit).  Errors raised by a command typed
+    at the prompt, and those without a traceback like SyntaxErrors, are
+    always passed on.
+    """
+    # Number of different errors remembered
+    max_errors = 1000
+
+    def __init__(self, hook, window=2.0, interval=5.0):
+        self.hook = hook
+        self.window = window
+        self.interval = interval
+        # Maps a fingerprint to [time last seen, repeats not yet reported,
+        # description]
+        self.errors = {}
+        self._timer = None
+        import atexit
+        atexit.register(self.summary)
+
+    def fingerprint(self, etype, value, tb):
+        locations = []
+        while tb is not None:
+            code = tb.tb_frame.f_code
+            locations.append((code.co_filename, code.co_name, tb.tb_lineno))
+            tb = tb.tb_next
+        try:
+            message = str(value)[:200]
+        except:
+            message = None
+        return etype, message, tuple(locations)
+
+    def filtered(self, tb):
+        """Whether errors with this traceback may be held back: not if
+        there's no traceback, or if it starts in code typed at the
+        prompt."""
+        if tb is None:
+            return 0
+        code = tb.tb_frame.f_code
+        return not (code.co_name == '<module>' and
+                    code.co_filename.startswith('<'))
+
+    def forked(self):
+        """Call this in a forked process.  The summary timer is gone there,
+        and the errors counted so far are the parent's."""
+        self._timer = None
+        self.errors.clear()
+        if hasattr(self.hook, 'forked'):
+            self.hook.forked()
+
+    def summary(self):
+        """Print the number of repeats of each error since the last
+        summary."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        out = []
+        for entry in self.errors.values():
+            if entry[1]:
+                out.append('%s[%s repeated %d more times]%s\n' %
+                           (Colors.emColor, entry[2], entry[1], Colors.Normal))
+                entry[1] = 0
+        if out:
+            sys.stderr.write(''.join(out))
+
+    def __call__(self, etype, value, tb):
+        if not self.filtered(tb):
+            self.summary()
+            self.hook(etype, value, tb)
+            return
+        now = time.time()
+        key = self.fingerprint(etype, value, tb)
+        entry = self.errors.get(key)
+        if entry is not None and now - entry[0] <= self.window:
+            entry[0] = now
+            entry[1] = entry[1] + 1
+            if getattr(self.hook, 'release', 0):
+                sys.last_traceback = None
+            if self._timer is None:
+                import threading
+                self._timer = threading.Timer(self.interval, self.summary)
+                self._timer.setDaemon(1)
+                self._timer.start()
+            return
+        self.summary()
+        if entry is None:
+            if len(self.errors) >= self.max_errors:
+                self.errors.clear()
+            name = getattr(etype, '__name__', str(etype))
+            if key[2]:
+                filename, func, lineno = key[2][-1]
+                name = '%s in %s (%s:%d)' % (name, func,
+                                             os.path.basename(filename),
+                                             lineno)
+            entry = self.errors[key] = [now, 0, name]
+        entry[0] = now
+        self.hook(etype, value, tb)
+
+
+class CrashDumper:
+    """Saves traceback snapshots to a file in directory, one JSON document
+    per line, so they survive the session.  The file is named after the
+    time the first snapshot was saved and the process id.  Writing happens
+    in a background thread, so the excepthook isn't held up by the disk.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.filename = None
+        self._queue = None
+
+    def forked(self):
+        """Call this in a forked process, which gets a file and a writer
+        thread of its own."""
+        self.filename = None
+        self._queue = None
+
+    def dump(self, snapshot):
+        if self._queue is None:
+            import Queue, threading, atexit
+            self._queue = Queue.Queue()
+            thread = threading.Thread(target=self._writer)
+            thread.setDaemon(1)
+            thread.start()
+            atexit.register(self.flush)
+        self._queue.put(snapshot)
+
+    def flush(self, timeout=2.0):
+        """Wait until the queued snapshots are written."""
+        end = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < end:
+            time.sleep(0.01)
+
+    def _writer(self):
+        while 1:
+            snapshot = self._queue.get()
+            try:
+                try:
+                    self.write(snapshot)
+                except Exception:
+                    pass
+            finally:
+                self._queue.task_done()
+
+    def write(self, snapshot):
+        import json
+        if self.filename is None:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            self.filename = os.path.join(self.directory, 'crash-%s-%d.jsonl'
+                                         % (time.strftime('%Y%m%d-%H%M%S'),
+                                            os.getpid()))
+        try:
+            line = json.dumps(snapshot, separators=(',', ':'))
+        except UnicodeDecodeError:
+            line = json.dumps(snapshot, separators=(',', ':'),
+                              encoding='latin-1')
+        fp = open(self.filename, 'a')
+        try:
+            fp.write(line + '\n')
+        finally:
+            fp.close()
+
+def load_dump(filename):
+    """Return the list of snapshots saved in a crash dump file."""
+    import json
+    snapshots = []
+    fp = open(filename)
+    try:
+        for line in fp:
+            if line.strip():
+                snapshots.append(json.loads(line))
+    finally:
+        fp.close()
+    return snapshots
+
+def show_dump(filename, index=-1, style='verbose'):
+    """Print a snapshot from a crash dump file the way VerboseTB (style
+    'verbose') or ColorTB (style 'color') would have printed it.
+    Usage:  >>> ultraTB.show_dump('~/.python/crashes/crash-...jsonl')
+    """
+    snapshot = load_dump(os.path.expanduser(filename))[index]
+    if style == 'color':
+        sys.stdout.write(ColorTB().render(snapshot))
+    else:
+        print VerboseTB().render(snapshot)
+
+# The snapshot of the last exception, kept by hooks created with release=1
+last_snapshot = None
+
+def release(snapshot):
+    """Keep snapshot for pm() and drop the interpreter's reference to the
+    last traceback, so that the frames and their locals can be freed."""
+    global last_snapshot
+    last_snapshot = snapshot
+    sys.last_traceback = None
+    try:
+        sys.exc_clear()
+    except AttributeError:
+        pass
+
+def pm(snapshot=None):
+    """Inspect the frames of the last exception after the fact.
+    Usage:  >>> pm([snapshot])   (brackets mean [optional] argument)
+    Browses the snapshot kept by an excepthook created with release=1 (or
+    one loaded with load_dump); without one, falls back to pdb.pm().
+    """
+    if snapshot is None:
+        snapshot = last_snapshot
+    if snapshot is None:
+        if getattr(sys, 'last_traceback', None) is None:
+            print 'No traceback to inspect.'
+            return
+        import pdb
+        pdb.pm()
+        return
+    SnapshotBrowser(snapshot).cmdloop()
+
+class SnapshotBrowser(cmd.Cmd):
+    """A pdb look-alike for traceback snapshots.  The frames are gone, so
+    all it can show are the source lines and the values' reprs."""
+    prompt = '(pm) '
+
+    def __init__(self, snapshot):
+        cmd.Cmd.__init__(self)
+        self.snapshot = snapshot
+        self.frames = snapshot['frames']
+        self.current = len(self.frames) - 1
+        self.intro = '%s: %s' % (snapshot['type'], snapshot['value'])
+        if self.frames:
+            self.intro = self.intro + '\n' + self._location(self.current)
+
+    def _location(self, i):
+        frame = self.frames[i]
+        line = ''
+        if frame['index'] is not None and frame['lines']:
+            line = '\n-> ' + frame['lines'][frame['index']].strip()
+        return '> %s(%s)%s()%s' % (frame['file'], frame['lnum'],
+                                   frame['func'], line)
+
+    def emptyline(self):
+        pass
+
+    def default(self, line):
+        print '*** Unknown command: %s (try help)' % line
+
+    def do_where(self, arg):
+        """w(here): list the frames, the current one marked with '>'."""
+        for i in range(len(self.frames)):
+            location = self._location(i)
+            if i != self.current:
+                location = ' ' + location[1:]
+            print location
+        if self.snapshot['brief']:
+            print '  ... %d more frames without details' % \
+                  len(self.snapshot['brief'])
+    do_w = do_where
+
+    def do_up(self, arg):
+        """u(p): move to the calling frame."""
+        if self.current == 0:
+            print '*** Oldest frame'
+            return
+        self.current = self.current - 1
+        print self._location(self.current)
+    do_u = do_up
+
+    def do_down(self, arg):
+        """d(own): move to the frame it called."""
+        if self.current >= len(self.frames) - 1:
+            print '*** Newest frame'
+            return
+        self.current = self.current + 1
+        print self._location(self.current)
+    do_d = do_down
+
+    def do_list(self, arg):
+        """l(ist): show the source around the current line."""
+        if not self.frames:
+            return
+        frame = self.frames[self.current]
+        if frame['index'] is None:
+            print '*** No source available'
+            return
+        i = frame['lnum'] - frame['index']
+        for line in frame['lines']:
+            if i == frame['lnum']:
+                marker = '->'
+            else:
+                marker = '  '
+            print '%4d %s %s' % (i, marker, line.rstrip())
+            i = i + 1
+    do_l = do_list
+
+    def do_args(self, arg):
+        """a(rgs): show the arguments of the current frame."""
+        if self.frames and self.frames[self.current]['call']:
+            print self.frames[self.current]['func'] + \
+                  self.frames[self.current]['call']
+    do_a = do_args
+
+    def do_locals(self, arg):
+        """v, locals: show the locals of the current frame."""
+        if not self.frames:
+            return
+        frame = self.frames[self.current]
+        if not frame.has_key('locals'):
+            print '*** Locals were not kept for this traceback'
+            return
+        for name, value in frame['locals']:
+            print '%s = %s' % (name, value)
+    do_v = do_locals
+
+    def do_p(self, arg):
+        """p name: show the value of a variable in the current frame."""
+        if not self.frames:
+            return
+        name = arg.strip()
+        frame = self.frames[self.current]
+        for entry in frame.get('locals', []) + frame['variables']:
+            if entry[0] == name:
+                if entry[1] is None:
+                    print '*** %s is undefined' % name
+                else:
+                    print entry[1]
+                return
+        print '*** %s was not kept' % name
+
+    def do_quit(self, arg):
+        """q(uit): leave the browser."""
+        return 1
+    do_q = do_quit
+
+    def do_EOF(self, arg):
+        print
+        return 1
         
         
 if __name__ == "__main__":
@@ -0,0 +1,495 @@
+"""
+workspace.py -- Keep track of the values in an interactive session.
+
+* OutputCache
+Every value shown at the prompt is kept in a cache, so that earlier results
+can be used again without assigning them first:
+    >>> 6 * 7
+    42
+    >>> out           # List the cached results
+    >>> out[1]        # The same as _1
+    42
+
+The cache holds at most max_entries results using at most max_bytes (as
+estimated by estimate_size), dropping the least recently used ones first.
+A dropped result that can be weakly referenced stays reachable through
+out[n] for as long as something else keeps it alive.  Use out.evict(n) or
+out.clear() to let go of results yourself.
+
+Installation:
+    import sys, workspace
+    out = workspace.OutputCache()
+    sys.displayhook = out.displayhook
+
+* who, whos
+List the variables you defined at the prompt, optionally only those of the
+given types.  whos also shows their types, shapes or lengths and about how
+much memory they use:
+    >>> who
+    >>> whos dict list
+Names starting with '_' and the names passed to hide() are left out.
+
+* save_session, load_session
+Save the variables defined at the prompt and get them back in another
+session, e.g. after a crash:
+    >>> save_session()
+    ...
+    >>> load_session()      # Restores the most recently saved session
+Sessions are kept in session_dir.  numpy arrays are saved as .npy files and
+memory-mapped when they're restored, so even big ones load instantly.
+"""
+
+import os, sys, time, types, weakref, itertools, cPickle, __builtin__
+
+# Containers with more items than this are sized from a sample of them
+_SAMPLE = 100
+# Don't look at more than this many objects per estimate
+_BUDGET = 2000
+
+_containers = (list, tuple, set, frozenset)
+
+def estimate_size(obj, sample=_SAMPLE, budget=_BUDGET):
+    """Return an estimate of the memory used by obj and the objects it
+    contains, in bytes.  Large containers are sized from a sample of their
+    items, and at most budget objects are looked at, so this is fast even
+    for huge data structures."""
+    return _size(obj, {}, [budget], sample)
+
+def _size(obj, seen, budget, sample):
+    if seen.has_key(id(obj)):
+        return 0
+    seen[id(obj)] = 1
+    budget[0] = budget[0] - 1
+    size = sys.getsizeof(obj, 0)
+    if budget[0] <= 0:
+        return size
+    if isinstance(obj, memoryview):
+        n = obj.itemsize
+        for dim in obj.shape or ():
+            n = n * dim
+        return size + n
+    try:
+        # Arrays know the size of their data (and their __sizeof__ may or
+        # may not include it)
+        nbytes = getattr(obj, 'nbytes', None)
+    except Exception:
+        nbytes = None
+    if isinstance(nbytes, (int, long)):
+        return max(size, nbytes)
+    if isinstance(obj, dict):
+        n = len(obj)
+        if n:
+            items = itertools.islice(obj.iteritems(), sample)
+            total = 0
+            k = 0
+            for key, value in items:
+                total = total + _size(key, seen, budget, sample) + \
+                        _size(value, seen, budget, sample)
+                k = k + 1
+            size = size + total * n / k
+    elif isinstance(obj, _containers):
+        n = len(obj)
+        if n:
+            if n > sample and isinstance(obj, (list, tuple)):
+                items = obj[::n // sample][:sample]
+            else:
+                items = itertools.islice(obj, sample)
+            total = 0
+            k = 0
+            for item in items:
+                total = total + _size(item, seen, budget, sample)
+                k = k + 1
+            size = size + total * n / k
+    elif not isinstance(obj, (type, types.ClassType, types.ModuleType,
+                              types.FunctionType, types.MethodType,
+                              types.BuiltinFunctionType)):
+        # Instances own their attributes, but classes, modules and
+        # functions are shared, so they're not counted
+        d = getattr(obj, '__dict__', None)
+        if isinstance(d, dict):
+            size = size + _size(d, seen, budget, sample)
+    return size
+
+def format_size(size):
+    for unit in ('bytes', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            break
+        size = size / 1024.0
+    if unit == 'bytes':
+        return '%d bytes' % size
+    return '%.1f %s' % (size, unit)
+
+
+class OutputCache:
+    """The results shown at the prompt, numbered from 1."""
+    def __init__(self, max_entries=100, max_bytes=256*1024*1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.size = 0
+        # Maps a number to [value, estimated size, last use]
+        self.entries = {}
+        # Maps a number to a weak reference to a dropped result
+        self.weak = {}
+        self._clock = 0
+
+    def _tick(self):
+        self._clock = self._clock + 1
+        return self._clock
+
+    def add(self, value):
+        """Cache value and return its number."""
+        self.count = n = self.count + 1
+        size = estimate_size(value)
+        self.entries[n] = [value, size, self._tick()]
+        self.size = self.size + size
+        setattr(__builtin__, '_%d' % n, value)
+        self._shrink()
+        return n
+
+    def _shrink(self):
+        # Drop the least recently used results, but never the newest one
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries
+                                         or self.size > self.max_bytes):
+            oldest = None
+            for n, entry in self.entries.items():
+                if n != self.count and \
+                        (oldest is None or entry[2] < self.entries[oldest][2]):
+                    oldest = n
+            self.evict(oldest, keep_weak=1)
+
+    def evict(self, n, keep_weak=0):
+        """Drop result n from the cache.  With keep_weak, it can still be
+        looked up while something else keeps it alive."""
+        entry = self.entries.pop(n, None)
+        self.weak.pop(n, None)
+        if entry is None:
+            return
+        self.size = self.size - entry[1]
+        try:
+            delattr(__builtin__, '_%d' % n)
+        except AttributeError:
+            pass
+        if keep_weak:
+            def forget(ref, n=n, weak=self.weak):
+                if weak.get(n) is ref:
+                    del weak[n]
+            try:
+                self.weak[n] = weakref.ref(entry[0], forget)
+            except TypeError:
+                pass
+
+    def clear(self):
+        """Drop all cached results."""
+        for n in self.entries.keys():
+            self.evict(n)
+        self.weak.clear()
+
+    def __getitem__(self, n):
+        if n < 0:
+            n = self.count + 1 + n
+        entry = self.entries.get(n)
+        if entry is not None:
+            entry[2] = self._tick()
+            return entry[0]
+        ref = self.weak.get(n)
+        if ref is not None:
+            value = ref()
+            if value is not None:
+                return value
+        if 0 < n <= self.count:
+            raise KeyError, 'Output %d was dropped from the cache' % n
+        raise KeyError, 'No output %d' % n
+
+    def __contains__(self, n):
+        try:
+            self[n]
+        except KeyError:
+            return 0
+        return 1
+
+    def __len__(self):
+        return len(self.entries)
+
+    def keys(self):
+        keys = self.entries.keys() + [n for n, ref in self.weak.items()
+                                      if ref() is not None]
+        keys.sort()
+        return keys
+
+    def __repr__(self):
+        lines = []
+        for n in self.keys():
+            entry = self.entries.get(n)
+            if entry is None:
+                value, size = self.weak[n](), '(weak)'
+            else:
+                value, size = entry[0], format_size(entry[1])
+            lines.append('%5d  %-16s %s' % (n, type(value).__name__, size))
+        lines.append('%d results, %s' % (len(self.entries),
+                                         format_size(self.size)))
+        return '\n'.join(lines)
+
+    def displayhook(self, value, show=None):
+        """A sys.displayhook that caches value and shows it (with show, if
+        given)."""
+        if value is None:
+            return
+        __builtin__._ = value
+        if value is not self:
+            self.add(value)
+        if show is None:
+            print repr(value)
+        else:
+            show(value)
+
+
+# Maps the names to leave out of who() and whos() to the id of their value
+hidden = {}
+
+def hide(namespace):
+    """Leave the variables currently in the namespace dictionary out of
+    who() and whos(), unless they are assigned something else later."""
+    for name, value in namespace.items():
+        hidden[name] = id(value)
+
+def _variables(type_names):
+    import __main__
+    type_names = [t for t in type_names if t]
+    variables = []
+    for name, value in __main__.__dict__.items():
+        if name.startswith('_') or hidden.get(name) == id(value):
+            continue
+        if type_names and type(value).__name__ not in type_names:
+            continue
+        variables.append((name, value))
+    variables.sort()
+    return variables
+
+def who(*type_names):
+    """List the variables defined at the prompt.
+    Usage:  >>> who [type_name ...]   (brackets mean [optional] argument)
+    """
+    line = ''
+    for name, value in _variables(type_names):
+        if line and len(line) + len(name) > 76:
+            print line
+            line = ''
+        line = line + name + '  '
+    if line:
+        print line
+
+def _shape(value):
+    try:
+        shape = getattr(value, 'shape', None)
+        if isinstance(shape, tuple):
+            return 'x'.join(map(str, shape))
+        if not isinstance(value, (type, types.ClassType)) and \
+                hasattr(value, '__len__'):
+            return str(len(value))
+    except Exception:
+        pass
+    return ''
+
+def whos(*type_names):
+    """List the variables defined at the prompt with their types, shapes
+    or lengths, and estimated memory use.
+    Usage:  >>> whos [type_name ...]   (brackets mean [optional] argument)
+    """
+    rows = [('Name', 'Type', 'Shape/Len', 'Memory')]
+    for name, value in _variables(type_names):
+        if isinstance(value, (types.ModuleType, type, types.ClassType,
+                              types.FunctionType,
+                              types.BuiltinFunctionType)):
+            size = ''
+        else:
+            size = format_size(estimate_size(value))
+        rows.append((name, type(value).__name__, _shape(value), size))
+    widths = [max([len(row[i]) for row in rows]) for i in range(3)]
+    for row in rows:
+        print '%-*s  %-*s  %*s  %s' % (widths[0], row[0], widths[1], row[1],
+                                       widths[2], row[2], row[3])
+
+
+# Where save_session() and load_session() keep sessions (startup.py puts
+# them in user_dir)
+session_dir = os.path.expanduser('~/.python/sessions')
+# The name this session is saved under by default
+def _new_session_name():
+    return 'session-%s-%d' % (time.strftime('%Y%m%d-%H%M%S'), os.getpid())
+session_name = _new_session_name()
+
+def forked():
+    """Call this in a forked process, so that it saves its variables under
+    a session name of its own."""
+    global session_name
+    session_name = _new_session_name()
+
+def _is_plain_array(value):
+    # If there are arrays, numpy has been imported already
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and type(value) is numpy.ndarray and \
+           not value.dtype.hasobject
+
+def _defined_in_main(value):
+    # Functions and classes defined at the prompt are pickled by name, so
+    # they can't be loaded into another session
+    if isinstance(value, (types.FunctionType, type, types.ClassType)):
+        return getattr(value, '__module__', None) == '__main__'
+    return 0
+
+def save_session(name=None):
+    """Save the variables defined at the prompt, to be restored with
+    load_session() in another session.
+    Usage:  >>> save_session([name])   (brackets mean [optional] argument)
+    Modules are saved by name, numpy arrays as .npy files and everything
+    else is pickled together, so that objects shared by several variables
+    are still shared when they're loaded.  Returns the names that could not
+    be saved.
+    """
+    name = name or session_name
+    directory = os.path.join(session_dir, name)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    # The files of this save get new names, and the index naming them
+    # replaces the old one at once, so a crash never leaves an index that
+    # doesn't match the files
+    generation = '%x-%d' % (int(time.time() * 1000), os.getpid())
+    data_file = 'data-' + generation
+    # Maps a name to ('module', module name), ('array', file name) or
+    # ('pickle', data file, offset)
+    index = {}
+    skipped = []
+    pickled = []
+    for var, value in _variables(()):
+        if isinstance(value, types.ModuleType):
+            index[var] = ('module', value.__name__)
+        elif _defined_in_main(value):
+            skipped.append(var)
+        elif _is_plain_array(value):
+            filename = '%s-%s.npy' % (var, generation)
+            try:
+                sys.modules['numpy'].save(os.path.join(directory, filename),
+                                          value)
+            except Exception:
+                skipped.append(var)
+            else:
+                index[var] = ('array', filename)
+        else:
+            pickled.append((var, value))
+    data = open(os.path.join(directory, data_file), 'wb')
+    try:
+        # Straight into the file, so big values aren't copied first
+        pickler = cPickle.Pickler(data, cPickle.HIGHEST_PROTOCOL)
+        memo = pickler.memo
+        for var, value in pickled:
+            offset = data.tell()
+            remembered = len(memo)
+            try:
+                pickler.dump(value)
+            except Exception:
+                # Take back what was written, and the objects the memo
+                # got meanwhile, which the file now doesn't have
+                data.seek(offset)
+                data.truncate()
+                for key, entry in memo.items():
+                    if entry[0] > remembered:
+                        del memo[key]
+                skipped.append(var)
+            else:
+                index[var] = ('pickle', data_file, offset)
+    finally:
+        data.close()
+    fp = open(os.path.join(directory, 'index.tmp'), 'wb')
+    try:
+        cPickle.dump(index, fp, cPickle.HIGHEST_PROTOCOL)
+    finally:
+        fp.close()
+    os.rename(os.path.join(directory, 'index.tmp'),
+              os.path.join(directory, 'index'))
+    # Remove the files of earlier saves
+    used = [data_file] + [entry[1] for entry in index.values()
+                          if entry[0] == 'array']
+    for filename in os.listdir(directory):
+        if filename not in used and filename != 'index':
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+    print 'Saved %d variables to %s' % (len(index), directory)
+    if skipped:
+        print 'Not saved:', ', '.join(skipped)
+    return skipped
+
+def sessions():
+    """Return the names of the saved sessions, most recent last."""
+    found = []
+    try:
+        names = os.listdir(session_dir)
+    except OSError:
+        return []
+    for name in names:
+        try:
+            mtime = os.stat(os.path.join(session_dir, name, 'index')).st_mtime
+        except OSError:
+            continue
+        found.append((mtime, name))
+    found.sort()
+    return [name for mtime, name in found]
+
+def load_session(name=None):
+    """Restore the variables saved by save_session(), by default from the
+    most recently saved session.
+    Usage:  >>> load_session([name])   (brackets mean [optional] argument)
+    numpy arrays are memory-mapped copy-on-write, so their data is only read
+    from disk when it's used.  Returns the names that could not be restored.
+    """
+    import __main__
+    if name is None:
+        saved = sessions()
+        if not saved:
+            print 'No saved sessions in', session_dir
+            return []
+        name = saved[-1]
+    directory = os.path.join(session_dir, name)
+    fp = open(os.path.join(directory, 'index'), 'rb')
+    try:
+        index = cPickle.load(fp)
+    finally:
+        fp.close()
+    restored = {}
+    skipped = []
+    pickled = []
+    for var, entry in index.items():
+        try:
+            if entry[0] == 'module':
+                restored[var] = __import__(entry[1], {}, {}, ['__name__'])
+            elif entry[0] == 'array':
+                import numpy
+                restored[var] = numpy.load(os.path.join(directory, entry[1]),
+                                           mmap_mode='c')
+            else:
+                pickled.append((entry[2], var, entry[1]))
+        except Exception:
+            skipped.append(var)
+    if pickled:
+        # Loaded in the order they were saved, with one unpickler, so the
+        # objects they share are shared again
+        pickled.sort()
+        data = open(os.path.join(directory, pickled[0][2]), 'rb')
+        try:
+            unpickler = cPickle.Unpickler(data)
+            for offset, var, data_file in pickled:
+                try:
+                    data.seek(offset)
+                    restored[var] = unpickler.load()
+                except Exception:
+                    skipped.append(var)
+        finally:
+            data.close()
+    __main__.__dict__.update(restored)
+    print 'Restored %d variables from %s' % (len(restored), directory)
+    if skipped:
+        skipped.sort()
+        print 'Not restored:', ', '.join(skipped)
+    return skipped
@@ -0,0 +1,308 @@
+"""
+zygote.py -- Start new interactive sessions by forking a warmed-up one.
+
+Every new interpreter imports the same modules and runs startup.py again.
+In zygote mode, the first session forks a server process that has done all
+that already, and new sessions are started by asking the server to fork a
+copy of itself attached to your terminal, which takes a few milliseconds.
+
+The server listens on a Unix socket in user_dir.  When startup.py or any
+module it had loaded changes, it exits, and the next session is started
+the normal way and forks a new server.
+
+Usage:  set PYTHONZYGOTE=1 in your environment and start sessions with
+    python -S $HOME/.python/zygote.py
+(an alias is handy).  This runs the normal interpreter when there's no
+server, or when given any arguments.
+"""
+
+import os, sys, time, errno, signal, socket, marshal
+
+# Functions called in the server right after it is forked, and again in
+# every session it forks, e.g. to reset locks that a thread of the parent
+# might have held, or to give each session a name of its own
+at_fork = []
+
+# The connection to the client in a forked session, closed when it exits
+_connection = None
+
+def socket_path():
+    home = os.path.expandvars('$HOME')
+    user_dir = os.path.join(home, os.environ.get("PYTHONUSERDIR", ".python"))
+    return os.path.join(user_dir, 'zygote.sock')
+
+def is_running(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except socket.error:
+            return 0
+        # An empty request just checks whether the server is there
+        sock.shutdown(socket.SHUT_WR)
+        return 1
+    finally:
+        sock.close()
+
+def _watched_files():
+    files = [os.environ.get('PYTHONSTARTUP')]
+    for module in sys.modules.values():
+        filename = getattr(module, '__file__', None)
+        if filename and filename[-4:] in ('.pyc', '.pyo'):
+            filename = filename[:-1]
+        files.append(filename)
+    watched = {}
+    for filename in files:
+        if filename:
+            try:
+                watched[filename] = os.stat(filename).st_mtime
+            except OSError:
+                pass
+    return watched
+
+def _changed(watched):
+    for filename, mtime in watched.items():
+        try:
+            if os.stat(filename).st_mtime != mtime:
+                return 1
+        except OSError:
+            return 1
+    return 0
+
+def start_server(path=None, histfile=None):
+    """Fork a zygote server unless one is running already.
+
+    Returns 0 in the calling session, right away, and 1 in every session
+    forked by the server later on, once it's attached to the client's
+    terminal.  histfile is read again in those sessions.
+    """
+    path = path or socket_path()
+    if is_running(path):
+        return 0
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)
+        return 0
+    # Detach completely from the calling session
+    try:
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+        _forked()
+        null = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(null, fd)
+        os.close(null)
+        if _serve(path):
+            _forked()
+            _attached(histfile)
+            return 1
+    except Exception:
+        pass
+    # Never run the session's atexit handlers in the server
+    os._exit(0)
+
+def _forked():
+    for func in at_fork:
+        try:
+            func()
+        except Exception:
+            pass
+
+def _reap(sessions, options=os.WNOHANG):
+    # Tell the clients of the sessions that exited their exit status
+    while sessions:
+        try:
+            pid, status = os.waitpid(-1, options)
+        except OSError, e:
+            if e.args[0] == errno.EINTR:
+                continue
+            sessions.clear()
+            return
+        if not pid:
+            return
+        conn = sessions.pop(pid, None)
+        if conn is None:
+            continue
+        if os.WIFSIGNALED(status):
+            code = 128 + os.WTERMSIG(status)
+        else:
+            code = os.WEXITSTATUS(status)
+        try:
+            conn.sendall('exit %d\n' % code)
+        except socket.error:
+            pass
+        conn.close()
+
+def _serve(path):
+    # Accept requests until something changes; returns 1 in forked sessions
+    watched = _watched_files()
+    # Maps the pid of a session to the connection to its client, which is
+    # sent the session's exit status
+    sessions = {}
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(077)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(5)
+    inode = os.stat(path).st_ino
+    listener.settimeout(30)
+    # Only there to interrupt accept() when a session exits
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    while 1:
+        try:
+            conn = listener.accept()[0]
+        except socket.timeout:
+            conn = None
+        except socket.error, e:
+            if e.args[0] == errno.EINTR:
+                _reap(sessions)
+                continue
+            raise
+        _reap(sessions)
+        try:
+            stale = os.stat(path).st_ino != inode
+            # Otherwise another server took over
+        except OSError:
+            stale = 1
+        if not stale and _changed(watched):
+            if conn is not None:
+                conn.sendall('stale\n')
+                conn.close()
+                conn = None
+            os.unlink(path)
+            stale = 1
+        if stale:
+            if conn is not None:
+                conn.close()
+            listener.close()
+            # Stay until the sessions are over, to report their status
+            _reap(sessions, 0)
+            return 0
+        if conn is None:
+            continue
+        conn.settimeout(5)
+        try:
+            request = _receive(conn)
+        except (socket.error, EOFError, ValueError, TypeError):
+            conn.close()
+            continue
+        if not request:
+            conn.close()
+            continue
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            listener.close()
+            for other in sessions.values():
+                other.close()
+            conn.settimeout(None)
+            _attach(conn, request)
+            return 1
+        sessions[pid] = conn
+
+def _receive(conn):
+    data = []
+    while 1:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data.append(chunk)
+    if not data:
+        return None
+    return marshal.loads(''.join(data))
+
+def _attach(conn, request):
+    # Become the client's session
+    global _connection
+    import fcntl
+    _connection = conn
+    flags = fcntl.fcntl(conn.fileno(), fcntl.F_GETFD)
+    fcntl.fcntl(conn.fileno(), fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+    os.setsid()
+    tty = os.open(request['tty'], os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(tty, fd)
+    os.close(tty)
+    os.chdir(request['cwd'])
+    os.environ.clear()
+    os.environ.update(request['env'])
+    conn.sendall('%d\n' % os.getpid())
+
+def _attached(histfile):
+    try:
+        import readline
+    except ImportError:
+        return
+    if histfile:
+        readline.clear_history()
+        try:
+            readline.read_history_file(histfile)
+        except IOError:
+            pass
+
+
+def _run_normally():
+    os.execv(sys.executable, [sys.executable] + sys.argv[1:])
+
+def main():
+    """Start a session forked by the server, or a normal one."""
+    if sys.argv[1:] or not os.environ.get('PYTHONZYGOTE') or \
+            not os.isatty(0):
+        _run_normally()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path())
+        sock.sendall(marshal.dumps({'tty': os.ttyname(0),
+                                    'cwd': os.getcwd(),
+                                    'env': dict(os.environ)}))
+        sock.shutdown(socket.SHUT_WR)
+        reply = sock.makefile().readline().strip()
+        pid = int(reply)
+    except (socket.error, ValueError, OSError):
+        sock.close()
+        _run_normally()
+
+    # The terminal's signals go to us, pass them on
+    def forward(signum, frame):
+        try:
+            os.kill(pid, signum)
+        except OSError:
+            pass
+    def stop(signum, frame):
+        forward(signal.SIGSTOP, frame)
+        signal.signal(signal.SIGTSTP, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTSTP)
+        # Continued
+        signal.signal(signal.SIGTSTP, stop)
+        forward(signal.SIGCONT, frame)
+    for signum in (signal.SIGINT, signal.SIGQUIT, signal.SIGTERM,
+                   signal.SIGHUP, signal.SIGWINCH):
+        signal.signal(signum, forward)
+    signal.signal(signal.SIGTSTP, stop)
+
+    # The session is over when the server sends its exit status
+    data = []
+    while 1:
+        try:
+            chunk = sock.recv(4096)
+        except socket.error, e:
+            if e.args[0] == errno.EINTR:
+                continue
+            break
+        if not chunk:
+            break
+        data.append(chunk)
+    try:
+        sys.exit(int(''.join(data).split()[-1]))
+    except (ValueError, IndexError):
+        sys.exit(0)
+
+if __name__ == '__main__':
+    main()